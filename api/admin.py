@@ -1,6 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Habit, Effort, CustomUser, Ticket, Announcement, Feature
+from .services import on_announcements_changed, on_features_changed
+from .models import (
+    Habit,
+    Effort,
+    CustomUser,
+    Ticket,
+    Announcement,
+    Feature,
+    WeeklyCompletion,
+)
 
 
 class CustomUserAdmin(UserAdmin):
@@ -41,9 +50,42 @@ class CustomUserAdmin(UserAdmin):
     ordering = ("email",)
 
 
+class FeatureAdmin(admin.ModelAdmin):
+    list_display = ("title", "status", "updated_date")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        on_features_changed()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        on_features_changed()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        on_features_changed()
+
+
+class AnnouncementAdmin(admin.ModelAdmin):
+    list_display = ("title", "type", "starting_date", "end_date")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        on_announcements_changed()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        on_announcements_changed()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        on_announcements_changed()
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Habit)
 admin.site.register(Effort)
 admin.site.register(Ticket)
-admin.site.register(Announcement)
-admin.site.register(Feature)
+admin.site.register(Announcement, AnnouncementAdmin)
+admin.site.register(Feature, FeatureAdmin)
+admin.site.register(WeeklyCompletion)
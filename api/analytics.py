@@ -0,0 +1,104 @@
+import numpy as np
+
+# Stands for the missing ending week of habits that are still open
+OPEN_ENDING_WEEK = np.iinfo(np.int64).max
+
+
+class HabitMatrix:
+    """
+    Effort levels of a set of habits as a habits x weeks matrix.
+
+    Row i belongs to habits[i] and column w to week w, so every analytics
+    function works on whole columns and rows instead of looping over efforts.
+    Levels of the same habit and week are summed.
+    """
+
+    def __init__(self, habits, efforts, min_weeks=53):
+        """
+        habits: Habit instances, efforts: (habit_id, week, level) tuples.
+        """
+        self.habits = list(habits)
+        self.expected_effort = np.array(
+            [habit.expected_effort for habit in self.habits], dtype=np.int64
+        )
+        self.starting_week = np.array(
+            [habit.starting_week for habit in self.habits], dtype=np.int64
+        )
+        self.ending_week = np.array(
+            [
+                OPEN_ENDING_WEEK if habit.ending_week is None else habit.ending_week
+                for habit in self.habits
+            ],
+            dtype=np.int64,
+        )
+
+        rows_by_habit = {habit.id: row for row, habit in enumerate(self.habits)}
+        efforts = np.array(
+            [
+                (rows_by_habit[habit_id], week, level)
+                for habit_id, week, level in efforts
+                if habit_id in rows_by_habit
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+
+        weeks = max(min_weeks, int(efforts[:, 1].max(initial=0))) + 1
+        self.levels = np.zeros((len(self.habits), weeks), dtype=np.int64)
+        np.add.at(self.levels, (efforts[:, 0], efforts[:, 1]), efforts[:, 2])
+
+
+def _percentage(numerator, denominator):
+    """
+    numerator / denominator * 100, and 0 where the denominator is not positive.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator * 100, denominator, out=result, where=denominator > 0)
+    return result
+
+
+def weekly_performance(levels, expected_effort):
+    """
+    Performance percentage of every level against the expected effort.
+    """
+    return _percentage(levels, expected_effort)
+
+
+def completion_percentage(matrix, week):
+    """
+    Average completion of the habits active in a week, each capped at 100%.
+    """
+    active = (matrix.starting_week <= week) & (matrix.ending_week >= week)
+    if not active.any():
+        return 0
+
+    actual = matrix.levels[active, week]
+    expected = matrix.expected_effort[active]
+    completion = np.where(
+        actual >= expected, 100.0, _percentage(actual, np.maximum(expected, 1))
+    )
+    return float(completion.mean())
+
+
+def habit_rollup(matrix, current_week):
+    """
+    Effort points, performance and contribution percentages of the habits that
+    started by the current week, counting efforts up to their ending week
+    clamped to the current week.
+
+    Returns the row indexes of those habits with the three aligned arrays.
+    """
+    rows = np.flatnonzero(matrix.starting_week <= current_week)
+    ending_week = np.minimum(matrix.ending_week[rows], current_week)
+
+    cumulative_levels = matrix.levels.cumsum(axis=1)
+    columns = np.clip(ending_week, 0, matrix.levels.shape[1] - 1)
+    effort_points = np.where(ending_week >= 0, cumulative_levels[rows, columns], 0)
+
+    weeks_since_start = ending_week - matrix.starting_week[rows] + 1
+    performance = _percentage(
+        effort_points, matrix.expected_effort[rows] * weeks_since_start
+    )
+    contribution = _percentage(effort_points, effort_points.sum())
+    return rows, effort_points, performance, contribution
@@ -0,0 +1,151 @@
+import abc
+import asyncio
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+from app.throttling import CombinedRateThrottle
+from .auth import BearerTokenAuthentication
+from .cache import acached_analytics
+from .models import Habit, Effort
+from . import periods
+from .services import (
+    compute_habit_performance,
+    get_completion_percentage,
+    get_recent_completions,
+    get_yearly_habit_performance,
+)
+
+
+def _in_own_connection(func):
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Hand the thread's connection back like at the end of a request
+            close_old_connections()
+
+    return wrapper
+
+
+async def run_concurrently(*funcs):
+    """
+    Run blocking ORM calls at the same time and return their results in order.
+
+    Each call runs on its own thread, and so on its own database connection,
+    instead of the single thread Django uses for sync code called from async
+    code, so the total latency is the one of the slowest call.
+    """
+    return await asyncio.gather(
+        *(
+            sync_to_async(_in_own_connection(func), thread_sensitive=False)()
+            for func in funcs
+        )
+    )
+
+
+class AsyncAnalyticsView(View, metaclass=abc.ABCMeta):
+    """
+    Base of the async versions of the analytics endpoints, served under ASGI.
+    It authenticates and throttles requests the same way as the DRF views.
+    """
+
+    authentication_class = BearerTokenAuthentication
+    throttle_class = CombinedRateThrottle
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await sync_to_async(self.authenticate)(request)
+        except exceptions.APIException as exc:
+            response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = self.authentication_class.keyword
+            if getattr(exc, "wait", None):
+                response["Retry-After"] = "%d" % exc.wait
+            return response
+
+        data = await self.get_data(user, *args, **kwargs)
+        return JsonResponse(data, encoder=JSONEncoder, safe=False)
+
+    def authenticate(self, request):
+        user_auth_tuple = self.authentication_class().authenticate(request)
+        if user_auth_tuple is None:
+            raise exceptions.NotAuthenticated()
+
+        request.user = user_auth_tuple[0]
+        throttle = self.throttle_class()
+        if not throttle.allow_request(request, self):
+            raise exceptions.Throttled(throttle.wait())
+        return request.user
+
+    @abc.abstractmethod
+    async def get_data(self, user, *args, **kwargs):
+        """
+        Data of the response, called with the arguments of the route.
+        """
+
+
+class AsyncEffortCompletionView(AsyncAnalyticsView):
+    async def get_data(self, user, week):
+        year = int(self.request.GET.get("year", periods.current_year()))
+
+        async def compute():
+            completion_percentage = await sync_to_async(
+                _in_own_connection(get_completion_percentage), thread_sensitive=False
+            )(user, year, week)
+            return {"completion_percentage": completion_percentage}
+
+        return await acached_analytics(
+            user, "completion", {"year": year, "week": week}, compute
+        )
+
+
+class AsyncHabitPerformanceView(AsyncAnalyticsView):
+    async def get_data(self, user, habit_id):
+        async def compute():
+            habit, efforts = await run_concurrently(
+                lambda: Habit.objects.get(id=habit_id, user=user),
+                lambda: list(
+                    Effort.objects.filter(habit_id=habit_id, user=user).values_list(
+                        "week", "level"
+                    )
+                ),
+            )
+            return compute_habit_performance(habit.expected_effort, efforts)
+
+        return await acached_analytics(
+            user, "performance", {"habit_id": habit_id}, compute
+        )
+
+
+class AsyncYearlyHabitPerformanceView(AsyncAnalyticsView):
+    async def get_data(self, user):
+        current_period = periods.current_period()
+
+        async def compute():
+            habit_performance = await sync_to_async(
+                _in_own_connection(get_yearly_habit_performance),
+                thread_sensitive=False,
+            )(user, current_period)
+            return habit_performance
+
+        return await acached_analytics(
+            user, "yearly-performance", {"current_period": current_period}, compute
+        )
+
+
+class AsyncRecentCompletionsView(AsyncAnalyticsView):
+    async def get_data(self, user, *args, **kwargs):
+        today = periods.today()
+
+        async def compute():
+            recent_completions = await sync_to_async(
+                _in_own_connection(get_recent_completions), thread_sensitive=False
+            )(user, today)
+            return recent_completions
+
+        return await acached_analytics(
+            user, "recent-completions", {"today": today}, compute
+        )
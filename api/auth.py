@@ -1,5 +1,112 @@
-from rest_framework.authentication import TokenAuthentication
+import hashlib
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from app import metrics
 
+TOKEN_CACHE_KEY = "auth:token-user:{digest}"
 
-class BearerTokenAuthentication(TokenAuthentication):
+
+def get_token_cache_key(key):
+    # Hash the token so raw credentials never end up in the cache backend
+    return TOKEN_CACHE_KEY.format(digest=hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_token(key):
+    cache.delete(get_token_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    keys = Token.objects.filter(user=user).values_list("key", flat=True)
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+def get_cached_fields():
+    # Every column of the user but its password hash, which stays deferred
+    return [
+        field.attname
+        for field in get_user_model()._meta.concrete_fields
+        if field.name != "password"
+    ]
+
+
+def to_cache(token):
+    return {
+        "created": token.created,
+        "user": [getattr(token.user, field) for field in get_cached_fields()],
+    }
+
+
+def from_cache(key, entry):
+    User = get_user_model()
+    user = User.from_db(router.db_for_read(User), get_cached_fields(), entry["user"])
+    token = Token(key=key, user=user, created=entry["created"])
+    token._state.adding = False
+    token._state.db = user._state.db
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication keeping a short lived token to user mapping in the
+    cache, so most requests are authenticated without touching the database.
+    Accepts every keyword in `keywords`, so a header is only parsed once.
+
+    Only the columns of the user are cached, without its password hash, and
+    the user is rebuilt from them with the password deferred.
+    """
+
+    keyword = "Token"
+    keywords = ("Token", "Bearer")
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        keywords = {keyword.lower().encode() for keyword in self.keywords}
+        if not auth or auth[0].lower() not in keywords:
+            return None
+
+        if len(auth) == 1:
+            msg = _("Invalid token header. No credentials provided.")
+            raise exceptions.AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _("Invalid token header. Token string should not contain spaces.")
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            msg = _(
+                "Invalid token header. Token string should not contain invalid characters."
+            )
+            raise exceptions.AuthenticationFailed(msg)
+
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        entry = cache.get(cache_key)
+
+        metrics.inc(
+            "cache_requests_total",
+            cache="auth",
+            result="miss" if entry is None else "hit",
+        )
+
+        if entry is None:
+            _, token = super().authenticate_credentials(key)
+            cache.set(cache_key, to_cache(token), timeout=settings.TOKEN_CACHE_TIMEOUT)
+        else:
+            token = from_cache(key, entry)
+
+        return (token.user, token)
+
+
+class BearerTokenAuthentication(CachedTokenAuthentication):
     keyword = "Bearer"  # Set the desired keyword to "Bearer"
+    keywords = ("Bearer",)
@@ -0,0 +1,360 @@
+import datetime
+import re
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .cache import _local_public_data
+from .models import Announcement, Effort, Feature, Habit, Ticket
+from .periods import (
+    LAST_WEEK,
+    frozen_today,
+    from_period,
+    period_of,
+    to_period,
+    weeks_in_year,
+)
+from .services import refresh_weekly_completions
+
+User = get_user_model()
+
+# Date the benchmarks run on, so the seeded data and responses are stable
+BENCHMARK_DATE = datetime.date(2023, 6, 14)
+
+PASSWORD = "benchmark-password"
+
+
+class Scenario:
+    """
+    A request to a route of app/urls.py. Parameters of the route are read from
+    the seeded context, renamed by params, and setup can add per-iteration
+    values to it, such as a fresh row to delete.
+    """
+
+    def __init__(
+        self,
+        route,
+        method="get",
+        client="user",
+        query="",
+        params=None,
+        data=None,
+        setup=None,
+    ):
+        self.route = route
+        self.method = method
+        self.client = client
+        self.query = query
+        self.params = params or {}
+        self.data = data
+        self.setup = setup
+
+    @property
+    def name(self):
+        return f"{self.method.upper()} {self.route}"
+
+    def path(self, context):
+        def value(match):
+            name = match.group(1)
+            return str(context[self.params.get(name, name)])
+
+        path = "/" + re.sub(r"<int:(\w+)>", value, self.route)
+        return path + (("?" + self.query.format(**context)) if self.query else "")
+
+
+def _fresh_user(context):
+    user = User.objects.create_user(
+        email=f"bench-{context['iteration']}@example.com", password=PASSWORD
+    )
+    return {"token": Token.objects.create(user=user).key}
+
+
+def _fresh_habit(context):
+    habit = Habit.objects.create(
+        name="Fresh", user=context["user"], expected_effort=1, starting_week=1
+    )
+    return {"fresh_habit_id": habit.id}
+
+
+# Reads come first so writes do not change what they return
+SCENARIOS = [
+    Scenario("api/features/", client="anon"),
+    Scenario("api/site-config/", client="anon"),
+    Scenario("api/announcements/active/", client="anon"),
+    Scenario("api/auth/user/"),
+    Scenario("api/habits/", query="year={year}"),
+    Scenario("api/habits/<int:pk>/", params={"pk": "habit_id"}),
+    Scenario("api/efforts/", query="year={year}"),
+    Scenario("api/efforts/<int:pk>/", params={"pk": "effort_id"}),
+    Scenario("api/efforts/week/<int:week>/", query="year={year}"),
+    Scenario("api/completion/<int:week>/", query="year={year}"),
+    Scenario("api/completion/<int:week>/recent"),
+    Scenario("api/performance/<int:habit_id>/"),
+    Scenario("api/performance/global/"),
+    Scenario("api/completion/rolling/<int:year>/"),
+    Scenario("api/performance/streaks/"),
+    Scenario("api/async/completion/<int:week>/", query="year={year}"),
+    Scenario("api/async/completion/<int:week>/recent"),
+    Scenario("api/async/performance/<int:habit_id>/"),
+    Scenario("api/async/performance/global/"),
+    Scenario("api/dashboard/<int:week>/"),
+    Scenario("api/tickets/"),
+    Scenario("api/backoffice/users/", client="staff"),
+    Scenario("api/backoffice/metrics/", client="staff"),
+    Scenario("api/backoffice/tickets/", client="staff"),
+    Scenario(
+        "api/backoffice/tickets/<int:pk>/", client="staff", params={"pk": "ticket_id"}
+    ),
+    Scenario("api/backoffice/announcements/", client="staff"),
+    Scenario(
+        "api/backoffice/announcements/<int:pk>/",
+        client="staff",
+        params={"pk": "announcement_id"},
+    ),
+    Scenario("api/backoffice/features/", client="staff"),
+    Scenario(
+        "api/backoffice/features/<int:pk>/",
+        client="staff",
+        params={"pk": "feature_id"},
+    ),
+    Scenario(
+        "api/auth/register/",
+        method="post",
+        client="anon",
+        data=lambda context: {
+            "email": f"register-{context['iteration']}@example.com",
+            "password": PASSWORD,
+            "first_name": "Bench",
+            "last_name": "Mark",
+        },
+    ),
+    Scenario(
+        "api/auth/login/",
+        method="post",
+        client="anon",
+        data=lambda context: {"email": context["user"].email, "password": PASSWORD},
+    ),
+    Scenario("api/auth/logout/", method="post", client="token", setup=_fresh_user),
+    Scenario(
+        "api/user/profile/",
+        method="patch",
+        data=lambda context: {"old_password": PASSWORD, "first_name": "Bench"},
+    ),
+    Scenario(
+        "api/tickets/create/",
+        method="post",
+        data=lambda context: {
+            "title": "Bench",
+            "content": "Bench",
+            "sender": context["user"].email,
+            "type": "web",
+        },
+    ),
+    Scenario(
+        "api/habits/",
+        method="post",
+        data=lambda context: {"name": "Bench", "expected_effort": 2},
+    ),
+    Scenario(
+        "api/efforts/",
+        method="post",
+        setup=_fresh_habit,
+        data=lambda context: {
+            "habit": context["fresh_habit_id"],
+            "week": context["week"],
+            "year": context["year"],
+            "level": 1,
+        },
+    ),
+    Scenario(
+        "api/efforts/bulk/",
+        method="post",
+        data=lambda context: [
+            {
+                "habit": habit_id,
+                "week": context["week"],
+                "year": context["year"],
+                "level": 2,
+            }
+            for habit_id in context["habit_ids"][:10]
+        ],
+    ),
+]
+
+
+def routes():
+    """
+    Routes of app/urls.py the benchmarks have to cover, all but the admin.
+    """
+    from app.urls import urlpatterns
+
+    return {
+        str(pattern.pattern)
+        for pattern in urlpatterns
+        if not str(pattern.pattern).startswith("admin/")
+    }
+
+
+def seed(habits=50, years=5, today=BENCHMARK_DATE):
+    """
+    Create a user with habits every year and an effort for every habit and
+    week of the years ending on today, a staff user and some backoffice rows.
+    Returns the context the scenarios are built from.
+    """
+    current_period = period_of(today)
+    current_year, current_week = from_period(current_period)
+    user = User.objects.create_user(email="bench@example.com", password=PASSWORD)
+    staff = User.objects.create_user(
+        email="staff@example.com", password=PASSWORD, is_staff=True
+    )
+
+    created = []
+    for year in range(current_year - years + 1, current_year + 1):
+        created += Habit.objects.bulk_create(
+            Habit(
+                name=f"Habit {number}",
+                user=user,
+                expected_effort=number % 5 + 1,
+                starting_week=1,
+                year=year,
+                starting_period=to_period(year, 1),
+                ending_period=to_period(year, LAST_WEEK),
+            )
+            for number in range(habits)
+        )
+    Effort.objects.bulk_create(
+        (
+            Effort(
+                habit=habit,
+                user=user,
+                year=habit.year,
+                week=week,
+                period=to_period(habit.year, week),
+                level=(habit.id + week) % 6,
+            )
+            for habit in created
+            for week in range(1, weeks_in_year(habit.year) + 1)
+            if to_period(habit.year, week) <= current_period
+        ),
+        batch_size=1000,
+    )
+    for year in range(current_year - years + 1, current_year + 1):
+        refresh_weekly_completions(user, year)
+
+    tickets = Ticket.objects.bulk_create(
+        Ticket(
+            title=f"Ticket {number}", content="Content", sender=user.email, type="web"
+        )
+        for number in range(20)
+    )
+    announcements = Announcement.objects.bulk_create(
+        Announcement(
+            title=f"Announcement {number}",
+            content="Content",
+            type="info",
+            starting_date=today - datetime.timedelta(days=number * 7),
+            end_date=today + datetime.timedelta(days=7 - number),
+        )
+        for number in range(10)
+    )
+    features = Feature.objects.bulk_create(
+        Feature(title=f"Feature {number}") for number in range(10)
+    )
+
+    current_habits = [habit.id for habit in created if habit.year == current_year]
+    return {
+        "user": user,
+        "staff": staff,
+        "tokens": {
+            "user": Token.objects.create(user=user).key,
+            "staff": Token.objects.create(user=staff).key,
+        },
+        "year": current_year,
+        "week": current_week,
+        "habit_id": current_habits[0],
+        "habit_ids": current_habits,
+        "effort_id": Effort.objects.get(
+            habit_id=current_habits[0], period=current_period
+        ).id,
+        "ticket_id": tickets[0].id,
+        "announcement_id": announcements[0].id,
+        "feature_id": features[0].id,
+    }
+
+
+def _clear_caches():
+    # Every request is measured cold, from the database
+    for cache in caches.all():
+        cache.clear()
+    _local_public_data.clear()
+
+
+def _content_length(response):
+    if response.streaming:
+        return len(b"".join(response.streaming_content))
+    return len(response.content)
+
+
+def run_scenario(scenario, context, iterations):
+    """
+    Request a scenario the given number of times. Returns its query count,
+    p50 and p95 latency in milliseconds and response size in bytes. Queries
+    the async views run in worker threads are not counted.
+    """
+    timings = []
+    queries = size = None
+    for iteration in range(iterations):
+        values = {**context, "iteration": iteration}
+        if scenario.setup:
+            values.update(scenario.setup(values))
+        client = APIClient()
+        if scenario.client == "token":
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {values['token']}")
+        elif scenario.client != "anon":
+            token = values["tokens"][scenario.client]
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        arguments = [scenario.path(values)]
+        if scenario.method != "get":
+            arguments += [scenario.data(values) if scenario.data else None, "json"]
+        _clear_caches()
+
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, scenario.method)(*arguments)
+            length = _content_length(response)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        if response.status_code >= 400:
+            raise AssertionError(
+                f"{scenario.name} answered {response.status_code}: {response.content!r}"
+            )
+        queries, size = len(captured), length
+
+    timings.sort()
+    return {
+        "queries": queries,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[max(int(len(timings) * 0.95) - 1, 0)], 2),
+        "bytes": size,
+    }
+
+
+def benchmark(habits=50, years=5, iterations=20):
+    """
+    Seed the data and run every scenario on BENCHMARK_DATE. Returns the
+    results by scenario name, in the order of SCENARIOS.
+    """
+    missing = routes() - {scenario.route for scenario in SCENARIOS}
+    if missing:
+        raise AssertionError(f"Routes without a benchmark: {sorted(missing)}")
+
+    with frozen_today(BENCHMARK_DATE):
+        context = seed(habits, years)
+        return {
+            scenario.name: run_scenario(scenario, context, iterations)
+            for scenario in SCENARIOS
+        }
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from app import metrics
+
+GENERATION_KEY = "analytics:generation:{user_id}"
+RESPONSE_KEY = "analytics:{user_id}:{generation}:{endpoint}:{params}"
+PUBLIC_DATA_KEY = "public:{name}"
+
+# In-process tier of the public data: name -> (expires_at, entry)
+_local_public_data = {}
+
+
+def _new_generation():
+    # Start from the clock so a lost counter can never collide with old entries.
+    return time.time_ns()
+
+
+def get_generation(user):
+    """
+    Current cache generation of a user. Cached analytics of older generations
+    are never read again and expire on their own.
+    """
+    key = GENERATION_KEY.format(user_id=user.pk)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        cache.add(key, generation, timeout=None)
+        generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(user):
+    """
+    Invalidate every cached analytics response of a user.
+    """
+    key = GENERATION_KEY.format(user_id=user.pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), timeout=None)
+
+
+def invalidate_generation(user):
+    """
+    Bump the generation of a user once the current transaction commits, so a
+    read racing the write cannot cache data of the old rows under the new
+    generation.
+    """
+    transaction.on_commit(lambda: bump_generation(user))
+
+
+def get_analytics_key(user, endpoint, params):
+    return RESPONSE_KEY.format(
+        user_id=user.pk,
+        generation=get_generation(user),
+        endpoint=endpoint,
+        params=":".join(f"{name}={value}" for name, value in sorted(params.items())),
+    )
+
+
+def cached_analytics(user, endpoint, params, compute):
+    """
+    Return the cached analytics data of a user for an endpoint and its params,
+    calling compute() and caching its result on a miss.
+    """
+    key = get_analytics_key(user, endpoint, params)
+    data = cache.get(key)
+    metrics.inc(
+        "cache_requests_total",
+        cache="analytics",
+        result="miss" if data is None else "hit",
+    )
+    if data is None:
+        data = compute()
+        cache.set(key, data, timeout=settings.ANALYTICS_CACHE_TIMEOUT)
+    return data
+
+
+async def acached_analytics(user, endpoint, params, compute):
+    """
+    Same as cached_analytics() for async views, compute is a coroutine function.
+    """
+    key = await sync_to_async(get_analytics_key)(user, endpoint, params)
+    data = await cache.aget(key)
+    metrics.inc(
+        "cache_requests_total",
+        cache="analytics",
+        result="miss" if data is None else "hit",
+    )
+    if data is None:
+        data = await compute()
+        await cache.aset(key, data, timeout=settings.ANALYTICS_CACHE_TIMEOUT)
+    return data
+
+
+def get_public_data(name, compute):
+    """
+    Public data shared by every user, as an entry with the data, its ETag and
+    the time it was computed.
+
+    Entries are read from this process' memory first, then from the shared
+    cache, and compute() is only called when both miss. The in-process tier is
+    trusted for PUBLIC_DATA_LOCAL_TIMEOUT seconds, so other processes see an
+    invalidation within that delay.
+    """
+    now = time.monotonic()
+    local = _local_public_data.get(name)
+    if local is not None and local[0] > now:
+        return local[1]
+
+    key = PUBLIC_DATA_KEY.format(name=name)
+    entry = cache.get(key)
+    if entry is None:
+        data = compute()
+        entry = {
+            "data": data,
+            "etag": hashlib.sha256(
+                json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+            ).hexdigest()[:32],
+            "last_modified": timezone.now(),
+        }
+        cache.set(key, entry, timeout=None)
+
+    _local_public_data[name] = (now + settings.PUBLIC_DATA_LOCAL_TIMEOUT, entry)
+    return entry
+
+
+def invalidate_public_data(name):
+    """
+    Drop the cached public data once the current transaction commits, so it is
+    never recomputed from rows about to change.
+    """
+
+    transaction.on_commit(lambda: delete_public_data(name))
+
+
+def delete_public_data(name):
+    """
+    Drop the cached public data right away, in every tier of this process.
+    """
+    cache.delete(PUBLIC_DATA_KEY.format(name=name))
+    _local_public_data.pop(name, None)
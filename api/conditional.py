@@ -0,0 +1,80 @@
+import hashlib
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+from . import periods
+from .cache import get_generation
+
+
+def _query_hash(request):
+    # Pages, filters and formats of the same list get different ETags
+    return hashlib.sha256(request.get_full_path().encode()).hexdigest()[:16]
+
+
+def _table_version(request, model):
+    """
+    Row count and last update of a table, read once per request.
+    """
+    if not hasattr(request, "table_versions"):
+        request.table_versions = {}
+    versions = request.table_versions
+    if model not in versions:
+        versions[model] = model.objects.aggregate(
+            count=Count("pk"), last_modified=Max("updated_date")
+        )
+    return versions[model]
+
+
+def table_condition(model, daily=False):
+    """
+    Conditional GET for a list of the rows of a model with an updated_date.
+
+    The version costs one aggregate query, and a matching If-None-Match or
+    If-Modified-Since returns 304 before anything is serialized. The row count
+    catches deletions, which leave the last update untouched. Lists whose
+    representation depends on the date are daily: their ETag changes every day
+    and they have no Last-Modified.
+    """
+
+    def etag(request, *args, **kwargs):
+        version = _table_version(request, model)
+        last_modified = version["last_modified"]
+        return "{}-{}-{}{}".format(
+            version["count"],
+            last_modified.timestamp() if last_modified else 0,
+            _query_hash(request),
+            f"-{periods.today().isoformat()}" if daily else "",
+        )
+
+    def last_modified(request, *args, **kwargs):
+        return _table_version(request, model)["last_modified"]
+
+    return condition(
+        etag_func=etag, last_modified_func=None if daily else last_modified
+    )
+
+
+def user_data_etag(request, *args, **kwargs):
+    """
+    ETag of the habits and efforts of the user, from the generation bumped on
+    every write to them. The current period is part of it since the habit
+    status depends on it.
+    """
+    return "{}-{}-{}".format(
+        get_generation(request.user), periods.current_period(), _query_hash(request)
+    )
+
+
+user_data_condition = condition(etag_func=user_data_etag)
+
+
+def public_data_condition(get_entry):
+    """
+    Conditional GET for an entry of the public data cache, answered without
+    touching the database.
+    """
+    return condition(
+        etag_func=lambda request, *args, **kwargs: get_entry()["etag"],
+        last_modified_func=lambda request, *args, **kwargs: get_entry()[
+            "last_modified"
+        ],
+    )
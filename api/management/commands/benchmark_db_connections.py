@@ -0,0 +1,66 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request database latency with a new connection for "
+        "every request and with the configured connection reuse"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        settings_dict = connection.settings_dict
+
+        # The baseline is a plain backend, without the pool when one is set
+        baseline_alias = f"{options['database']}_benchmark_baseline"
+        connections.settings[baseline_alias] = {
+            **settings_dict,
+            "ENGINE": (
+                "django.db.backends.postgresql"
+                if settings_dict["ENGINE"] == "app.postgresql_pool"
+                else settings_dict["ENGINE"]
+            ),
+            "CONN_MAX_AGE": 0,
+        }
+
+        modes = [("new connection per request", connections[baseline_alias])]
+        if settings_dict["CONN_MAX_AGE"] != 0 or settings_dict.get("POOL_SIZE"):
+            modes.append(("configured connection reuse", connection))
+
+        try:
+            for name, mode_connection in modes:
+                timings = self.run_requests(mode_connection, options["requests"])
+                self.report(name, timings)
+        finally:
+            for _, mode_connection in modes:
+                mode_connection.close()
+            del connections[baseline_alias]
+            del connections.settings[baseline_alias]
+
+    def run_requests(self, connection, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            # The same lifecycle as a request served by the WSGI handler
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, name, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"{name}: mean {statistics.mean(timings):.2f}ms, "
+            f"p50 {statistics.median(timings):.2f}ms, p95 {p95:.2f}ms"
+        )
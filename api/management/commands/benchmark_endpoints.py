@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from api.benchmarks import benchmark
+
+BASELINES = Path(__file__).resolve().parents[2] / "benchmark_baselines.json"
+
+# The benchmarks clear the cache before every request, never the shared one
+BENCHMARK_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every API endpoint against seeded data in a test database, "
+        "reporting query counts, latency and response sizes, and fail on a "
+        "regression from the stored baselines"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=50, help="Habits per year")
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--baselines", default=str(BASELINES))
+        parser.add_argument(
+            "--update-baselines",
+            action="store_true",
+            help="Store the results as the new baselines instead of comparing",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.1,
+            help="Allowed relative growth of the response sizes",
+        )
+        parser.add_argument(
+            "--latency-tolerance",
+            type=float,
+            default=1.0,
+            help="Allowed relative growth of the p95 latency",
+        )
+
+    def handle(self, *args, **options):
+        volumes = {"habits": options["habits"], "years": options["years"]}
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                results = benchmark(iterations=options["requests"], **volumes)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: {result['queries']} queries, p50 {result['p50_ms']:.2f}ms, "
+                f"p95 {result['p95_ms']:.2f}ms, {result['bytes']} bytes"
+            )
+
+        path = Path(options["baselines"])
+        if options["update_baselines"]:
+            path.write_text(
+                json.dumps({"volumes": volumes, "results": results}, indent=2) + "\n"
+            )
+            self.stdout.write(f"Stored the baselines in {path}")
+            return
+
+        if not path.exists():
+            raise CommandError(f"No baselines in {path}, run with --update-baselines")
+        baselines = json.loads(path.read_text())
+        if baselines["volumes"] != volumes:
+            raise CommandError(
+                f"The baselines were measured with {baselines['volumes']}"
+            )
+
+        regressions = self.compare(results, baselines["results"], options)
+        if regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+        self.stdout.write("No regressions")
+
+    def compare(self, results, baselines, options):
+        regressions = []
+        for name, result in results.items():
+            baseline = baselines.get(name)
+            if baseline is None:
+                regressions.append(f"{name}: no baseline")
+                continue
+            # Query counts do not depend on the machine, any increase counts
+            if result["queries"] > baseline["queries"]:
+                regressions.append(
+                    f"{name}: {result['queries']} queries, "
+                    f"was {baseline['queries']}"
+                )
+            if result["bytes"] > baseline["bytes"] * (1 + options["tolerance"]):
+                regressions.append(
+                    f"{name}: {result['bytes']} bytes, was {baseline['bytes']}"
+                )
+            allowed = baseline["p95_ms"] * (1 + options["latency_tolerance"])
+            if result["p95_ms"] > allowed:
+                regressions.append(
+                    f"{name}: p95 {result['p95_ms']:.2f}ms, "
+                    f"was {baseline['p95_ms']:.2f}ms"
+                )
+        return regressions
@@ -0,0 +1,130 @@
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.renderers import JSONRenderer
+from api.models import Effort, Habit
+from api.periods import to_period
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    EffortSerializer,
+    EffortValuesSerializer,
+    HabitSerializer,
+    HabitValuesSerializer,
+)
+
+User = get_user_model()
+
+YEAR = 2023
+WEEKS = 50
+
+
+def to_rows(serializer, queryset):
+    return serializer.to_rows(serializer.get_values(queryset))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the model serializers and the values() "
+        "serializers of habit and effort lists, and of the DRF and orjson "
+        "renderers, on seeded rows in a test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user = self.seed(options["rows"])
+            self.run(user, options["rows"], options["repeat"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def seed(self, rows):
+        """
+        rows habits, and rows efforts over the weeks of the first habits.
+        """
+        user = User.objects.create_user(email="bench@example.com", password="bench")
+        habits = Habit.objects.bulk_create(
+            Habit(
+                name=f"Habit {number}",
+                user=user,
+                expected_effort=number % 5 + 1,
+                starting_week=1,
+                year=YEAR,
+                starting_period=to_period(YEAR, 1),
+                ending_period=to_period(YEAR, WEEKS),
+                ending_week=WEEKS if number % 2 else None,
+            )
+            for number in range(rows)
+        )
+        Effort.objects.bulk_create(
+            (
+                Effort(
+                    habit=habits[number // WEEKS],
+                    user=user,
+                    year=YEAR,
+                    week=number % WEEKS + 1,
+                    period=to_period(YEAR, number % WEEKS + 1),
+                    level=number % 6,
+                )
+                for number in range(rows)
+            ),
+            batch_size=1000,
+        )
+        return user
+
+    def run(self, user, rows, repeat):
+        habits = Habit.objects.filter(user=user).order_by("id")
+        efforts = Effort.objects.filter(user=user).order_by("id")
+
+        cases = [
+            (
+                "habits, HabitSerializer",
+                lambda: HabitSerializer(habits.all(), many=True).data,
+            ),
+            (
+                "habits, HabitValuesSerializer",
+                lambda: to_rows(HabitValuesSerializer(), habits),
+            ),
+            (
+                "efforts with habits, EffortSerializer",
+                lambda: EffortSerializer(
+                    efforts.select_related("habit"), many=True
+                ).data,
+            ),
+            (
+                "efforts with habits, EffortValuesSerializer",
+                lambda: to_rows(EffortValuesSerializer(), efforts),
+            ),
+        ]
+        data = to_rows(EffortValuesSerializer(), efforts)
+        cases += [
+            (
+                f"efforts with habits, {renderer.__name__}",
+                lambda renderer=renderer: renderer().render(data),
+            )
+            for renderer in (JSONRenderer, FastJSONRenderer)
+        ]
+
+        for name, case in cases:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                case()
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            self.stdout.write(
+                f"{name}: {rows} rows, median {median:.1f}ms, "
+                f"best {min(timings):.1f}ms, {rows / median * 1000:,.0f} rows/s"
+            )
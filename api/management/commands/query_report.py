@@ -0,0 +1,68 @@
+import collections
+import json
+import statistics
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Sum up the query inspection log by URL name: query counts, SQL time, "
+        "queries repeated within a request and slow queries"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=str(settings.QUERY_INSPECTION_LOG))
+        parser.add_argument(
+            "--top", type=int, default=5, help="Query shapes listed per URL name"
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["log"])
+        if not path.exists():
+            raise CommandError(
+                f"No query inspection log in {path}, set QUERY_INSPECTION=true"
+            )
+
+        endpoints = collections.defaultdict(list)
+        with path.open() as file:
+            for line in file:
+                report = json.loads(line)
+                endpoints[report["url_name"]].append(report)
+
+        # The endpoints spending the most time in the database first
+        for name, reports in sorted(
+            endpoints.items(),
+            key=lambda item: -sum(report["db_ms"] for report in item[1]),
+        ):
+            self.report(name, reports, options["top"])
+
+    def report(self, name, reports, top):
+        queries = [report["queries"] for report in reports]
+        db_ms = [report["db_ms"] for report in reports]
+        self.stdout.write(
+            f"{name}: {len(reports)} requests, "
+            f"queries mean {statistics.mean(queries):.1f} max {max(queries)}, "
+            f"SQL mean {statistics.mean(db_ms):.2f}ms max {max(db_ms):.2f}ms"
+        )
+
+        repeated = collections.Counter()
+        requests_repeating = collections.Counter()
+        for report in reports:
+            for query in report["repeated"]:
+                repeated[query["sql"]] = max(repeated[query["sql"]], query["count"])
+                requests_repeating[query["sql"]] += 1
+        for sql, count in repeated.most_common(top):
+            self.stdout.write(
+                f"  N+1: up to {count}x in {requests_repeating[sql]} requests: {sql}"
+            )
+
+        slow = collections.defaultdict(list)
+        for report in reports:
+            for query in report["slow"]:
+                slow[query["sql"]].append(query["ms"])
+        for sql, timings in sorted(slow.items(), key=lambda item: -max(item[1]))[:top]:
+            self.stdout.write(
+                f"  slow: {len(timings)}x, max {max(timings):.2f}ms: {sql}"
+            )
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Habit, Effort, WeeklyCompletion
+from api.services import refresh_weekly_completions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized weekly completions from habits and efforts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--email", help="Only rebuild the weekly completions of this user"
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["email"]:
+            users = users.filter(email=options["email"])
+
+        WeeklyCompletion.objects.filter(user__in=users).delete()
+
+        user_years = set(
+            Habit.objects.filter(user__in=users).values_list("user", "year")
+        ) | set(Effort.objects.filter(user__in=users).values_list("user", "year"))
+        users_by_id = users.in_bulk({user_id for user_id, _ in user_years})
+
+        for user_id, year in sorted(user_years):
+            refresh_weekly_completions(users_by_id[user_id], year)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt weekly completions for {len(user_years)} user years"
+            )
+        )
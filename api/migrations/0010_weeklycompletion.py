@@ -0,0 +1,45 @@
+# Generated by Django 4.2.2 on 2026-10-18 15:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0009_alter_effort_week_alter_habit_starting_week"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeeklyCompletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField()),
+                ("week", models.PositiveIntegerField()),
+                ("expected_sum", models.IntegerField(default=0)),
+                ("actual_sum", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="weeklycompletion",
+            constraint=models.UniqueConstraint(
+                fields=("user", "year", "week"), name="unique_weekly_completion"
+            ),
+        ),
+    ]
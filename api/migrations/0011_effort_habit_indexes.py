@@ -0,0 +1,56 @@
+# Generated by Django 4.2.2 on 2026-10-18 15:36
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_efforts(apps, schema_editor):
+    """
+    Keep the first effort logged for a habit and week, as the API used to reject
+    any later one.
+    """
+    Effort = apps.get_model("api", "Effort")
+    duplicates = (
+        Effort.objects.values("habit", "week", "year", "user")
+        .annotate(first_id=Min("id"), count=Count("id"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        Effort.objects.filter(
+            habit=duplicate["habit"],
+            week=duplicate["week"],
+            year=duplicate["year"],
+            user=duplicate["user"],
+        ).exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0010_weeklycompletion"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_efforts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="effort",
+            index=models.Index(
+                fields=["user", "year", "week"],
+                include=("level",),
+                name="effort_user_year_week_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                fields=["user", "year", "starting_week"],
+                name="habit_user_year_week_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="effort",
+            constraint=models.UniqueConstraint(
+                fields=("habit", "week", "year", "user"), name="unique_effort"
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_periods(apps, schema_editor):
+    """
+    Derive the period keys of existing rows from their year and weeks.
+    """
+    Habit = apps.get_model("api", "Habit")
+    Effort = apps.get_model("api", "Effort")
+    WeeklyCompletion = apps.get_model("api", "WeeklyCompletion")
+
+    Habit.objects.update(
+        starting_period=F("year") * 100 + F("starting_week"),
+        ending_period=F("year") * 100 + Coalesce("ending_week", Value(53)),
+    )
+    Effort.objects.update(period=F("year") * 100 + F("week"))
+    WeeklyCompletion.objects.update(period=F("year") * 100 + F("week"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0011_effort_habit_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="starting_period",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="ending_period",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="effort",
+            name="period",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="weeklycompletion",
+            name="period",
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_periods, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="effort",
+            name="effort_user_year_week_idx",
+        ),
+        migrations.AddIndex(
+            model_name="effort",
+            index=models.Index(
+                fields=["user", "period"],
+                include=("level",),
+                name="effort_user_period_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                fields=["user", "starting_period"], name="habit_user_period_idx"
+            ),
+        ),
+        migrations.RemoveConstraint(
+            model_name="weeklycompletion",
+            name="unique_weekly_completion",
+        ),
+        migrations.AddConstraint(
+            model_name="weeklycompletion",
+            constraint=models.UniqueConstraint(
+                fields=("user", "period"), name="unique_weekly_completion"
+            ),
+        ),
+    ]
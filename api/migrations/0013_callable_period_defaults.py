@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-18 15:56
+
+import api.periods
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0012_period_keys"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="effort",
+            name="week",
+            field=models.PositiveIntegerField(default=api.periods.current_week),
+        ),
+        migrations.AlterField(
+            model_name="effort",
+            name="year",
+            field=models.PositiveIntegerField(default=api.periods.current_year),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="starting_week",
+            field=models.PositiveIntegerField(default=api.periods.current_week),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="year",
+            field=models.PositiveIntegerField(default=api.periods.current_year),
+        ),
+    ]
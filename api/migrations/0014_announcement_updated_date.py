@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-18 18:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_callable_period_defaults"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="announcement",
+            name="updated_date",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0014_announcement_updated_date"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="announcement",
+            index=models.Index(
+                fields=["end_date", "starting_date"], name="announcement_dates_idx"
+            ),
+        ),
+    ]
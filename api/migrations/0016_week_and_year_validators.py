@@ -0,0 +1,71 @@
+# Generated by Django 4.2.2 on 2026-10-18 16:39
+
+import api.periods
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0015_announcement_dates_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="effort",
+            name="week",
+            field=models.PositiveIntegerField(
+                default=api.periods.current_week,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(53),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="effort",
+            name="year",
+            field=models.PositiveIntegerField(
+                default=api.periods.current_year,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(9999),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="ending_week",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=None,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(53),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="starting_week",
+            field=models.PositiveIntegerField(
+                default=api.periods.current_week,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(53),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="year",
+            field=models.PositiveIntegerField(
+                default=api.periods.current_year,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(9999),
+                ],
+            ),
+        ),
+    ]
@@ -1,23 +1,82 @@
-import datetime
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.conf import settings
+from .periods import (
+    LAST_WEEK,
+    MAX_YEAR,
+    MIN_YEAR,
+    current_week,
+    current_year,
+    to_period,
+    weeks_in_year,
+)
+
+# Weeks and years period keys are valid for, a week past the last one of its
+# year would share the period key of a week of the next year
+WEEK_VALIDATORS = [MinValueValidator(1), MaxValueValidator(LAST_WEEK)]
+YEAR_VALIDATORS = [MinValueValidator(MIN_YEAR), MaxValueValidator(MAX_YEAR)]
+
+
+def validate_weeks(year, **weeks):
+    """
+    Check the given weeks, by field name, exist in year.
+    """
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        return
+    last_week = weeks_in_year(year)
+    errors = {
+        field: f"Year {year} has {last_week} weeks."
+        for field, week in weeks.items()
+        if week is not None and week > last_week
+    }
+    if errors:
+        raise ValidationError(errors)
 
 
 class Habit(models.Model):
     name = models.CharField(max_length=255)
     starting_week = models.PositiveIntegerField(
-        default=datetime.date.today().isocalendar()[1]
+        default=current_week, validators=WEEK_VALIDATORS
     )
     expected_effort = models.IntegerField()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     color = models.CharField(max_length=255, default="rose")
-    year = models.PositiveIntegerField(default=datetime.date.today().year)
-    ending_week = models.PositiveIntegerField(default=None, null=True, blank=True)
+    year = models.PositiveIntegerField(default=current_year, validators=YEAR_VALIDATORS)
+    ending_week = models.PositiveIntegerField(
+        default=None, null=True, blank=True, validators=WEEK_VALIDATORS
+    )
+    # Period keys of the first and last week of the habit, which lasts until
+    # the end of its year when it has no ending week
+    starting_period = models.PositiveIntegerField(default=0, editable=False)
+    ending_period = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "year", "starting_week"],
+                name="habit_user_year_week_idx",
+            ),
+            models.Index(
+                fields=["user", "starting_period"],
+                name="habit_user_period_idx",
+            ),
+        ]
+
+    def clean(self):
+        validate_weeks(
+            self.year, starting_week=self.starting_week, ending_week=self.ending_week
+        )
+
+    def save(self, *args, **kwargs):
+        self.starting_period = to_period(self.year, self.starting_week)
+        self.ending_period = to_period(self.year, self.ending_week or LAST_WEEK)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} - From: week {self.starting_week}"
@@ -25,15 +84,63 @@ class Habit(models.Model):
 
 class Effort(models.Model):
     habit = models.ForeignKey(Habit, on_delete=models.CASCADE)
-    week = models.PositiveIntegerField(default=datetime.date.today().isocalendar()[1])
+    week = models.PositiveIntegerField(default=current_week, validators=WEEK_VALIDATORS)
     level = models.IntegerField()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    year = models.PositiveIntegerField(default=datetime.date.today().year)
+    year = models.PositiveIntegerField(default=current_year, validators=YEAR_VALIDATORS)
+    # Period key of year and week, kept in sync on save
+    period = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "week", "year", "user"], name="unique_effort"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "period"],
+                include=["level"],
+                name="effort_user_period_idx",
+            )
+        ]
+
+    def clean(self):
+        validate_weeks(self.year, week=self.week)
+
+    def save(self, *args, **kwargs):
+        self.period = to_period(self.year, self.week)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Habit: {self.habit.name} - Week: {self.week} - Level: {self.level}"
 
 
+class WeeklyCompletion(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField()
+    week = models.PositiveIntegerField()
+    period = models.PositiveIntegerField()
+    expected_sum = models.IntegerField(default=0)
+    actual_sum = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "period"], name="unique_weekly_completion"
+            )
+        ]
+
+    @property
+    def completion_percentage(self):
+        if self.expected_sum > 0:
+            return round((self.actual_sum / self.expected_sum) * 100, 2)
+        return 0
+
+    def __str__(self):
+        return f"User: {self.user_id} - Year: {self.year} - Week: {self.week}"
+
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -106,6 +213,15 @@ class Announcement(models.Model):
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     starting_date = models.DateField()
     end_date = models.DateField()
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["end_date", "starting_date"],
+                name="announcement_dates_idx",
+            )
+        ]
 
     def __str__(self):
         return f"{self.title}"
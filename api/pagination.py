@@ -0,0 +1,116 @@
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward only keyset pagination over a unique ordering.
+
+    The cursor holds the ordering values of the last item of the page, so every
+    page is a single indexed range query no matter how deep it is. Pagination is
+    opt-in: lists are only paginated when a page_size is requested.
+    """
+
+    ordering = ()
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if self.page_size is None:
+            return None
+
+        self.request = request
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset[: self.page_size + 1])
+        page = results[: self.page_size]
+
+        self.next_position = None
+        if len(results) > self.page_size:
+            self.next_position = [
+                self.get_value(page[-1], field) for field in self.ordering
+            ]
+
+        return page
+
+    @staticmethod
+    def get_value(item, field):
+        # Pages are model instances or the dicts of values() querysets
+        return item[field] if isinstance(item, dict) else getattr(item, field)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def get_position_filter(self, position):
+        # (a, b, c) > (x, y, z) expanded as a > x OR (a = x AND b > y) OR ...
+        position_filter = Q()
+        for index, field in enumerate(self.ordering):
+            equal_fields = dict(zip(self.ordering[:index], position[:index]))
+            position_filter |= Q(**equal_fields, **{f"{field}__gt": position[index]})
+        return position_filter
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Every ordering field is an integer
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.ordering)
+            or not all(
+                isinstance(value, int) and not isinstance(value, bool)
+                for value in position
+            )
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode("ascii"))
+        return encoded.decode("ascii")
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class EffortPagination(KeysetPagination):
+    ordering = ("year", "week", "id")
+
+
+class HabitPagination(KeysetPagination):
+    ordering = ("year", "starting_week", "id")
@@ -0,0 +1,99 @@
+import contextlib
+import datetime
+import functools
+from django.utils import timezone
+
+# Ending week of habits that are open until the end of their year, greater
+# than or equal to the last ISO week of any year
+LAST_WEEK = 53
+
+# Years of the calendar weeks can be computed for
+MIN_YEAR = datetime.MINYEAR
+MAX_YEAR = datetime.MAXYEAR
+
+
+def to_period(year, week):
+    """
+    Sortable key of an ISO week, comparable across years: year * 100 + week.
+    """
+    return year * 100 + week
+
+
+def from_period(period):
+    """
+    (year, week) of a period key.
+    """
+    return divmod(period, 100)
+
+
+@functools.lru_cache(maxsize=8)
+def period_of(date):
+    """
+    Period key of the ISO week a date belongs to.
+    """
+    year, week, _ = date.isocalendar()
+    return to_period(year, week)
+
+
+def weeks_in_year(year):
+    """
+    Number of ISO weeks of a year, 52 or 53.
+    """
+    return datetime.date(year, 12, 28).isocalendar()[1]
+
+
+def previous_periods(date, count):
+    """
+    Period keys of the count weeks ending on the week of a date, oldest first,
+    going back into the previous year if needed.
+    """
+    return [
+        period_of(date - datetime.timedelta(weeks=weeks_ago))
+        for weeks_ago in reversed(range(count))
+    ]
+
+
+# Date returned by today() instead of the real one, see frozen_today()
+_frozen_today = None
+
+
+def today():
+    """
+    Current date in the configured time zone, which decides the current period.
+    """
+    return _frozen_today or timezone.localdate()
+
+
+@contextlib.contextmanager
+def frozen_today(date):
+    """
+    Make today() return the given date, to test code depending on the
+    current period.
+    """
+    global _frozen_today
+    previous, _frozen_today = _frozen_today, date
+    try:
+        yield
+    finally:
+        _frozen_today = previous
+
+
+def current_period():
+    """
+    Period key of the current ISO week, computed once per day.
+    """
+    return period_of(today())
+
+
+def current_year():
+    """
+    ISO year of the current week. Default of the year of habits and efforts.
+    """
+    return from_period(current_period())[0]
+
+
+def current_week():
+    """
+    Current ISO week. Default of the week of habits and efforts.
+    """
+    return from_period(current_period())[1]
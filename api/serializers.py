@@ -1,12 +1,27 @@
 from django.forms import ValidationError
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.utils import timezone
-from .models import Habit, Effort, CustomUser, Ticket, Announcement, Feature
+from django.utils.functional import cached_property
+from .models import (
+    Habit,
+    Effort,
+    CustomUser,
+    Ticket,
+    Announcement,
+    Feature,
+    validate_weeks,
+)
+from .periods import current_period, current_week, current_year, today
 
 User = get_user_model()
 
 
+def get_value(serializer, attrs, field, default=None):
+    # Validated value of a field, or the one of the instance a partial update
+    # leaves unchanged
+    return attrs.get(field, getattr(serializer.instance, field, default))
+
+
 class UserSerializer(serializers.ModelSerializer):
     old_password = serializers.CharField(write_only=True)
     password = serializers.CharField(write_only=True, required=True)
@@ -51,14 +66,13 @@ class HabitSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Habit
-        fields = "__all__"
+        exclude = ["starting_period", "ending_period"]
         extra_kwargs = {"user": {"read_only": True}}
 
     def get_status(self, obj):
         if obj.ending_week is None:
             return "open"  # Consider 'open' if no ending_week is set
-        current_week = timezone.now().date().isocalendar()[1]
-        if current_week <= obj.ending_week:
+        if current_period() <= obj.ending_period:
             return "open"
         else:
             return "finished"
@@ -72,6 +86,11 @@ class HabitSerializer(serializers.ModelSerializer):
                 raise ValidationError(
                     "Ending week must be equal to or greater than starting week."
                 )
+        validate_weeks(
+            get_value(self, data, "year", current_year()),
+            starting_week=get_value(self, data, "starting_week"),
+            ending_week=get_value(self, data, "ending_week"),
+        )
         return data
 
 
@@ -80,12 +99,153 @@ class EffortSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Effort
-        fields = "__all__"
+        exclude = ["period"]
         extra_kwargs = {"user": {"read_only": True}}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Only keep the fields requested through the context, if any
+        fields = self.context.get("fields")
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def validate(self, attrs):
+        validate_weeks(
+            get_value(self, attrs, "year", current_year()),
+            week=get_value(self, attrs, "week"),
+        )
+        return attrs
+
+    @property
+    def expand_habit(self):
+        return "habit" in self.fields and "habit" in self.context.get(
+            "expand", {"habit"}
+        )
+
+    @cached_property
+    def habit_serializer(self):
+        # Built once and reused for every effort of a list
+        return HabitSerializer(context=self.context)
+
     def to_representation(self, instance):
-        self.fields["habit"] = HabitSerializer()
-        return super(EffortSerializer, self).to_representation(instance)
+        representation = super().to_representation(instance)
+        if self.expand_habit:
+            representation["habit"] = self.habit_serializer.to_representation(
+                instance.habit
+            )
+        return representation
+
+
+class HabitValuesSerializer:
+    """
+    Read only HabitSerializer for lists: shapes the rows of values() into the
+    same representation, without building a model instance and a field tree
+    per row. The status is decided from the current period read once.
+    """
+
+    fields = [
+        "id",
+        "status",
+        "name",
+        "starting_week",
+        "expected_effort",
+        "color",
+        "year",
+        "ending_week",
+        "user",
+    ]
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    @property
+    def columns(self):
+        # The ending period decides the status, it is not part of the output
+        return [field for field in self.fields if field != "status"] + ["ending_period"]
+
+    def get_values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row, period):
+        representation = {field: row.get(field) for field in self.fields}
+        if row["ending_week"] is None or period <= row["ending_period"]:
+            representation["status"] = "open"
+        else:
+            representation["status"] = "finished"
+        return representation
+
+    def to_rows(self, rows):
+        period = current_period()
+        return [self.to_representation(row, period) for row in rows]
+
+
+class EffortValuesSerializer:
+    """
+    Read only EffortSerializer for lists, see HabitValuesSerializer. Takes the
+    same fields and expand context, nested habits are read in the same query.
+    """
+
+    fields = ["id", "habit", "week", "level", "year", "user"]
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.habit_serializer = HabitValuesSerializer(self.context)
+
+    @cached_property
+    def output_fields(self):
+        fields = self.context.get("fields")
+        if fields is None:
+            return self.fields
+        return [field for field in self.fields if field in fields]
+
+    @property
+    def expand_habit(self):
+        return "habit" in self.output_fields and "habit" in self.context.get(
+            "expand", {"habit"}
+        )
+
+    def get_values(self, queryset):
+        # Every column is read, pagination needs the ordering ones
+        columns = list(self.fields)
+        if self.expand_habit:
+            columns += [f"habit__{field}" for field in self.habit_serializer.columns]
+        return queryset.values(*columns)
+
+    def to_rows(self, rows):
+        period = current_period()
+        fields = self.output_fields
+        habit_columns = [
+            (field, f"habit__{field}") for field in self.habit_serializer.columns
+        ]
+        representations = []
+        for row in rows:
+            representation = {field: row[field] for field in fields}
+            if self.expand_habit:
+                habit = {field: row[column] for field, column in habit_columns}
+                representation["habit"] = self.habit_serializer.to_representation(
+                    habit, period
+                )
+            representations.append(representation)
+        return representations
+
+
+class EffortBulkItemSerializer(serializers.ModelSerializer):
+    # Plain id, ownership of every habit is checked at once by the view
+    habit = serializers.IntegerField()
+
+    class Meta:
+        model = Effort
+        fields = ["habit", "week", "level", "year"]
+
+    def validate(self, attrs):
+        # Same defaults as the model, which bulk_create would not apply before
+        # the view keys the items by habit and week
+        attrs.setdefault("week", current_week())
+        attrs.setdefault("year", current_year())
+        validate_weeks(attrs["year"], week=attrs["week"])
+        return attrs
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -132,7 +292,7 @@ class AnnouncementSerializer(serializers.ModelSerializer):
         ]
 
     def get_status(self, obj):
-        return "ON" if obj.end_date > timezone.now().date() else "OFF"
+        return "ON" if obj.end_date > today() else "OFF"
 
 
 class FeatureSerializer(serializers.ModelSerializer):
@@ -0,0 +1,585 @@
+import datetime
+import logging
+import numpy as np
+from django.db import DatabaseError, connection, connections
+from django.db.models import (
+    Avg,
+    Case,
+    F,
+    FloatField,
+    OuterRef,
+    RowRange,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+from . import analytics
+from .cache import (
+    delete_public_data,
+    get_public_data,
+    invalidate_generation,
+    invalidate_public_data,
+)
+from .models import Announcement, Habit, Effort, Feature, WeeklyCompletion
+from .periods import (
+    current_period,
+    from_period,
+    period_of,
+    previous_periods,
+    to_period,
+    weeks_in_year,
+)
+from .periods import today as current_date
+from .serializers import (
+    AnnouncementSerializer,
+    HabitSerializer,
+    EffortSerializer,
+    FeatureSerializer,
+)
+
+
+def active_habits(user, period):
+    """
+    Habits of the user that already started and had not ended by the given period.
+    """
+    return Habit.objects.filter(
+        user=user, starting_period__lte=period, ending_period__gte=period
+    )
+
+
+def get_completion_percentage(user, year, week):
+    """
+    Average completion percentage of the user's active habits for a week.
+
+    Each habit contributes its actual effort over its expected effort, capped at
+    100%. Everything is computed in a single query regardless of habit count.
+    """
+    period = to_period(year, week)
+    actual_effort = (
+        Effort.objects.filter(habit=OuterRef("pk"), user=user, period=period)
+        .values("habit")
+        .annotate(total=Sum("level"))
+        .values("total")
+    )
+
+    result = (
+        active_habits(user, period)
+        .annotate(actual_effort=Coalesce(Subquery(actual_effort), 0))
+        .aggregate(
+            completion_percentage=Avg(
+                Case(
+                    When(
+                        actual_effort__gte=F("expected_effort"),
+                        then=Value(100.0),
+                    ),
+                    default=Cast("actual_effort", FloatField())
+                    * 100
+                    / F("expected_effort"),
+                    output_field=FloatField(),
+                )
+            )
+        )
+    )
+
+    return result["completion_percentage"] or 0
+
+
+def get_habit_performance(user, habit_id):
+    """
+    Weekly performance of a habit against its expected effort, and its average.
+    """
+    habit = Habit.objects.get(id=habit_id, user=user)
+    efforts = Effort.objects.filter(habit=habit, user=user).values_list("week", "level")
+
+    return compute_habit_performance(habit.expected_effort, efforts)
+
+
+def compute_habit_performance(expected_effort, efforts):
+    """
+    Weekly performance and its average from the (week, level) pairs of a habit.
+    """
+    weeks, levels = np.array(list(efforts), dtype=np.int64).reshape(-1, 2).T
+    performance = analytics.weekly_performance(levels, expected_effort)
+
+    return {
+        "performance_data": [
+            {"week": week, "performance_percentage": round(percentage, 2)}
+            for week, percentage in zip(weeks.tolist(), performance.tolist())
+        ],
+        "average_performance_percentage": round(
+            float(performance.mean()) if len(performance) else 0, 2
+        ),
+    }
+
+
+def _december_31_weekday(year):
+    # Weekday of December 31 of a year as SQL, 0 being Sunday
+    return f"(({year}) + ({year}) / 4 - ({year}) / 100 + ({year}) / 400) %% 7"
+
+
+# Whether the year before a period has 53 ISO weeks, as in weeks_in_year():
+# its December 31 is a Thursday, or a Friday of a leap year
+PREVIOUS_YEAR_IS_LONG = (
+    f"({_december_31_weekday('period / 100 - 1')} = 4"
+    f" OR {_december_31_weekday('period / 100 - 2')} = 3)"
+)
+
+HABIT_STREAKS_SQL = f"""
+WITH weekly_efforts AS (
+    SELECT effort.habit_id, effort.period, SUM(effort.level) AS level
+    FROM {Effort._meta.db_table} effort
+    WHERE effort.user_id = %(user_id)s
+    GROUP BY effort.habit_id, effort.period
+),
+met_weeks AS (
+    SELECT
+        weekly_efforts.habit_id,
+        weekly_efforts.period,
+        LAG(weekly_efforts.period) OVER (
+            PARTITION BY weekly_efforts.habit_id ORDER BY weekly_efforts.period
+        ) AS previous_period
+    FROM weekly_efforts
+    JOIN {Habit._meta.db_table} habit ON habit.id = weekly_efforts.habit_id
+    WHERE weekly_efforts.level >= habit.expected_effort
+),
+islands AS (
+    SELECT
+        habit_id,
+        period,
+        SUM(
+            CASE
+                WHEN period = previous_period + 1 THEN 0
+                WHEN period %% 100 = 1 AND previous_period = period - 100 + (
+                    CASE WHEN {PREVIOUS_YEAR_IS_LONG} THEN 52 ELSE 51 END
+                ) THEN 0
+                ELSE 1
+            END
+        ) OVER (
+            PARTITION BY habit_id ORDER BY period ROWS UNBOUNDED PRECEDING
+        ) AS island
+    FROM met_weeks
+),
+streaks AS (
+    SELECT habit_id, COUNT(*) AS length, MAX(period) AS last_period
+    FROM islands
+    GROUP BY habit_id, island
+)
+SELECT
+    habit.id,
+    COALESCE(
+        MAX(
+            CASE WHEN streaks.last_period IN (%(current_period)s, %(previous_period)s)
+            THEN streaks.length END
+        ),
+        0
+    ) AS current_streak,
+    COALESCE(MAX(streaks.length), 0) AS longest_streak
+FROM {Habit._meta.db_table} habit
+LEFT JOIN streaks ON streaks.habit_id = habit.id
+WHERE habit.user_id = %(user_id)s
+GROUP BY habit.id
+ORDER BY habit.id
+"""
+
+
+def get_habit_streaks(user, today):
+    """
+    Current and longest streak of weeks of every habit of the user in which
+    the habit met its expected effort, in a single query.
+
+    Islands of consecutive met weeks are found with LAG over the efforts of
+    each habit, and a week 1 continues the last week of the year before. The
+    current streak is the one reaching this week, or the week before since the
+    current week may still be in progress.
+    """
+    previous_period, current_period = previous_periods(today, 2)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            HABIT_STREAKS_SQL,
+            {
+                "user_id": user.pk,
+                "current_period": current_period,
+                "previous_period": previous_period,
+            },
+        )
+        return [
+            {
+                "habit": habit_id,
+                "current_streak": current_streak,
+                "longest_streak": longest_streak,
+            }
+            for habit_id, current_streak, longest_streak in cursor.fetchall()
+        ]
+
+
+def get_rolling_completions(user, year, window, last_week=None):
+    """
+    Completion percentage of every week of a year with its average over the
+    window of weeks ending on it, from the materialized completions.
+
+    The rolling average is a window function, so the whole series is a single
+    query. Weeks of the start of the year average over fewer weeks.
+    """
+    last_week = min(last_week or weeks_in_year(year), weeks_in_year(year))
+
+    completions = (
+        WeeklyCompletion.objects.filter(
+            user=user, period__range=(to_period(year, 1), to_period(year, last_week))
+        )
+        .annotate(
+            weekly_completion=Coalesce(
+                Cast("actual_sum", FloatField())
+                * 100
+                / NullIf(Cast("expected_sum", FloatField()), 0.0),
+                0.0,
+            )
+        )
+        .annotate(
+            rolling_completion=Window(
+                Avg("weekly_completion"),
+                order_by="period",
+                frame=RowRange(start=-(window - 1), end=0),
+            )
+        )
+        .order_by("period")
+        .values_list("week", "weekly_completion", "rolling_completion")
+    )
+
+    return [
+        {
+            "week": week,
+            "completion_percentage": round(weekly_completion, 2),
+            "rolling_completion_percentage": round(rolling_completion, 2),
+        }
+        for week, weekly_completion, rolling_completion in completions
+    ]
+
+
+def refresh_weekly_completions(user, year, weeks=None):
+    """
+    Recompute the materialized weekly completions of a user for a year.
+    Habits are expected in the weeks they are active, as in active_habits().
+
+    Only the given weeks are refreshed, or every week of the year if none are
+    given. Takes a fixed number of queries regardless of the number of weeks.
+    """
+    if weeks is None:
+        weeks = range(1, weeks_in_year(year) + 1)
+    else:
+        weeks = sorted(set(weeks))
+    periods = [to_period(year, week) for week in weeks]
+
+    habits = list(
+        Habit.objects.filter(user=user, year=year).values_list(
+            "starting_period", "ending_period", "expected_effort"
+        )
+    )
+    actual_sums = dict(
+        Effort.objects.filter(user=user, period__in=periods)
+        .values("week")
+        .annotate(total=Sum("level"))
+        .values_list("week", "total")
+    )
+
+    if not habits and not actual_sums:
+        WeeklyCompletion.objects.filter(user=user, period__in=periods).delete()
+        return
+
+    WeeklyCompletion.objects.bulk_create(
+        [
+            WeeklyCompletion(
+                user=user,
+                year=year,
+                week=week,
+                period=period,
+                expected_sum=sum(
+                    expected_effort
+                    for starting_period, ending_period, expected_effort in habits
+                    if starting_period <= period <= ending_period
+                ),
+                actual_sum=actual_sums.get(week) or 0,
+            )
+            for week, period in zip(weeks, periods)
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "period"],
+        update_fields=["expected_sum", "actual_sum"],
+    )
+
+
+def get_yearly_habit_performance(user, current_period):
+    """
+    Serialized habits of the current year with their rounded performance and
+    contribution percentages, by contribution in descending order.
+    """
+    year, current_week = from_period(current_period)
+    matrix = analytics.HabitMatrix(
+        Habit.objects.filter(user=user, year=year),
+        Effort.objects.filter(
+            user=user, period__range=(to_period(year, 1), current_period)
+        ).values_list("habit", "week", "level"),
+    )
+    return _serialize_habit_rollup(matrix, current_week)
+
+
+def _serialize_habit_rollup(matrix, current_week):
+    rows, _, performance, contribution = analytics.habit_rollup(matrix, current_week)
+    habit_ids = np.array([matrix.habits[row].id for row in rows], dtype=np.int64)
+    order = np.lexsort((habit_ids, -contribution))
+
+    habits = [matrix.habits[rows[i]] for i in order]
+    serialized_habits = HabitSerializer(habits, many=True).data
+
+    return [
+        {
+            "habit": habit_data,
+            "performance_percentage": round(performance_percentage, 2),
+            "contribution_percentage": round(contribution_percentage, 2),
+        }
+        for habit_data, performance_percentage, contribution_percentage in zip(
+            serialized_habits,
+            performance[order].tolist(),
+            contribution[order].tolist(),
+        )
+    ]
+
+
+def get_recent_completions(user, today):
+    """
+    Completion percentages of the current week and the 4 previous weeks, with
+    the difference to the week before, read from the materialized completions.
+    In January the previous weeks are the last ones of the year before.
+    """
+    periods = previous_periods(today, 5)
+
+    completions = {
+        completion.period: completion.completion_percentage
+        for completion in WeeklyCompletion.objects.filter(
+            user=user, period__range=(periods[0], periods[-1])
+        )
+    }
+
+    return compute_recent_completions(periods, completions)
+
+
+def compute_recent_completions(periods, completions):
+    """
+    Completion percentage of every period with the difference to the one
+    before, from a {period: completion_percentage} mapping.
+    """
+    response = []
+
+    for i, period in enumerate(periods):
+        year, week = from_period(period)
+        completion_percentage = completions.get(period, 0)
+
+        if i > 0:
+            difference = round(
+                completion_percentage - response[i - 1]["completion_percentage"], 2
+            )
+        else:
+            difference = 0
+
+        response.append(
+            {
+                "year": year,
+                "week": week,
+                "completion_percentage": completion_percentage,
+                "difference": difference,
+            }
+        )
+
+    return response
+
+
+def on_habits_changed(user, *years):
+    """
+    Keep derived data in sync after habits of the given years were written.
+    """
+    for year in set(years):
+        refresh_weekly_completions(user, year)
+
+    invalidate_generation(user)
+
+
+def on_efforts_changed(user, *periods):
+    """
+    Keep derived data in sync after efforts of the given (year, week) were written.
+    """
+    weeks_by_year = {}
+    for year, week in periods:
+        weeks_by_year.setdefault(year, set()).add(week)
+
+    for year, weeks in weeks_by_year.items():
+        refresh_weekly_completions(user, year, weeks)
+
+    invalidate_generation(user)
+
+
+def get_dashboard(user, week, year, today):
+    """
+    Every widget of the home screen, derived from a single load of the user's
+    habits and efforts of the requested and current years, up to the requested
+    or current week.
+
+    The payloads match the ones of the site config, habit list, weekly effort
+    list, completion, recent completions and global performance endpoints.
+    """
+    current_period = period_of(today)
+    current_year, current_week = from_period(current_period)
+    period = to_period(year, week)
+
+    habits = list(Habit.objects.filter(user=user, year__in={year, current_year}))
+    habits_by_id = {habit.id: habit for habit in habits}
+
+    efforts = [
+        effort
+        for effort in Effort.objects.filter(
+            user=user,
+            period__range=(
+                to_period(min(year, current_year), 1),
+                max(period, current_period),
+            ),
+        )
+        if effort.habit_id in habits_by_id
+    ]
+    for effort in efforts:
+        effort.habit = habits_by_id[effort.habit_id]
+
+    year_habits = sorted(
+        (habit for habit in habits if habit.year == year),
+        key=lambda habit: (habit.starting_week, -habit.expected_effort),
+    )
+    week_efforts = [effort for effort in efforts if effort.period == period]
+
+    return {
+        "site_config": {"current_week": current_week},
+        "habits": HabitSerializer(year_habits, many=True).data,
+        "efforts": EffortSerializer(week_efforts, many=True).data,
+        "completion": {
+            "completion_percentage": analytics.completion_percentage(
+                _year_matrix(habits, efforts, year, period), week
+            )
+        },
+        "recent_completions": get_recent_completions(user, today),
+        "global_performance": _serialize_habit_rollup(
+            _year_matrix(habits, efforts, current_year, current_period),
+            current_week,
+        ),
+    }
+
+
+def _year_matrix(habits, efforts, year, last_period):
+    return analytics.HabitMatrix(
+        [habit for habit in habits if habit.year == year],
+        [
+            (effort.habit_id, effort.week, effort.level)
+            for effort in efforts
+            if effort.year == year and effort.period <= last_period
+        ],
+    )
+
+
+def get_public_features():
+    """
+    Cached entry of the serialized feature list shown before login.
+    """
+    return get_public_data(
+        "features",
+        lambda: FeatureSerializer(Feature.objects.order_by("id"), many=True).data,
+    )
+
+
+def get_site_config():
+    """
+    Cached entry of the site config, which changes with the current period.
+    """
+    period = current_period()
+    return get_public_data(
+        f"site-config:{period}", lambda: {"current_week": from_period(period)[1]}
+    )
+
+
+def on_features_changed():
+    """
+    Keep the cached public feature list in sync after features were written.
+    """
+    invalidate_public_data("features")
+
+
+def get_active_announcements(today):
+    """
+    Cached entry of the announcements running today, valid until the next
+    date on which one starts, ends or changes status.
+    """
+    entry = get_public_data(
+        "active-announcements", lambda: _compute_active_announcements(today)
+    )
+    valid_until = entry["data"]["valid_until"]
+    if not (
+        entry["data"]["valid_from"] <= today
+        and (valid_until is None or today < valid_until)
+    ):
+        delete_public_data("active-announcements")
+        entry = get_public_data(
+            "active-announcements", lambda: _compute_active_announcements(today)
+        )
+    return entry
+
+
+def _compute_active_announcements(today):
+    # Running and upcoming announcements in one range scan of the dates index
+    announcements = list(
+        Announcement.objects.filter(end_date__gte=today).order_by("starting_date", "id")
+    )
+    active = [
+        announcement
+        for announcement in announcements
+        if announcement.starting_date <= today
+    ]
+
+    # The status of an announcement switches to OFF on its end date
+    boundaries = [
+        date
+        for announcement in announcements
+        for date in (
+            announcement.starting_date,
+            announcement.end_date,
+            announcement.end_date + datetime.timedelta(days=1),
+        )
+        if date > today
+    ]
+
+    return {
+        "valid_from": today,
+        "valid_until": min(boundaries, default=None),
+        "results": AnnouncementSerializer(active, many=True).data,
+    }
+
+
+def on_announcements_changed():
+    """
+    Keep the cached active announcements in sync after announcements were written.
+    """
+    invalidate_public_data("active-announcements")
+
+
+def warm_public_data():
+    """
+    Fill the public data caches, so the first anonymous requests of a process
+    do not hit the database. A process starting while the database is down
+    fills them on its first requests instead. Queries the database, so it
+    must not be called from an event loop.
+    """
+    try:
+        get_public_features()
+        get_site_config()
+        get_active_announcements(current_date())
+    except DatabaseError:
+        logging.warning("Could not warm the public data caches", exc_info=True)
+    finally:
+        # Never hand a connection opened at startup over to forked workers
+        connections.close_all()
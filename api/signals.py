@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .auth import invalidate_token, invalidate_user_tokens
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, **kwargs):
+    # Cached tokens hold a copy of their user: any change, such as a new name,
+    # password or staff status, must be read again. Dropped once committed so
+    # a concurrent request cannot cache the previous row again. Bulk updates
+    # send no signal and leave cached users until TOKEN_CACHE_TIMEOUT.
+    if not created:
+        transaction.on_commit(lambda: invalidate_user_tokens(instance))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # Also sent for the tokens of a deleted user. The key is the primary key,
+    # cleared once the delete is done
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
@@ -1,3 +1,1319 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from app import metrics
+from middlewares.query_inspection import normalize_sql
+from . import analytics, benchmarks
+from .auth import get_token_cache_key
+from .cache import _local_public_data, get_generation
+from .management.commands.benchmark_endpoints import BASELINES
+from .models import Announcement, Habit, Effort, Feature, WeeklyCompletion
+from .periods import current_week, current_year, frozen_today
+from .renderers import FastJSONRenderer
+from .serializers import (
+    EffortSerializer,
+    EffortValuesSerializer,
+    HabitSerializer,
+    HabitValuesSerializer,
+)
+from .services import (
+    active_habits,
+    compute_habit_performance,
+    get_completion_percentage,
+    get_habit_streaks,
+    get_public_features,
+    get_recent_completions,
+    get_rolling_completions,
+)
 
-# Create your tests here.
+User = get_user_model()
+
+
+class AuthenticatedTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@test.com", password="pass")
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.key}")
+        cache.clear()
+        _local_public_data.clear()
+
+
+class CompletionPercentageTests(AuthenticatedTestCase):
+    def create_habit(self, expected_effort, level=None, week=10, **kwargs):
+        habit = Habit.objects.create(
+            name="Habit",
+            user=self.user,
+            expected_effort=expected_effort,
+            starting_week=kwargs.pop("starting_week", 1),
+            year=kwargs.pop("year", 2023),
+            **kwargs,
+        )
+        if level is not None:
+            Effort.objects.create(
+                habit=habit, user=self.user, week=week, level=level, year=habit.year
+            )
+        return habit
+
+    def test_completion_is_capped_per_habit(self):
+        self.create_habit(expected_effort=4, level=8)
+        self.create_habit(expected_effort=4, level=1)
+
+        self.assertEqual(get_completion_percentage(self.user, 2023, 10), 62.5)
+
+    def test_completion_ignores_inactive_habits(self):
+        self.create_habit(expected_effort=4, level=2)
+        self.create_habit(expected_effort=4, level=4, starting_week=11)
+        self.create_habit(expected_effort=4, level=4, ending_week=9)
+        self.create_habit(expected_effort=4, ending_week=10)
+        self.create_habit(expected_effort=4, level=4, year=2022)
+
+        self.assertEqual(get_completion_percentage(self.user, 2023, 10), 25)
+
+    def test_completion_without_habits(self):
+        self.assertEqual(get_completion_percentage(self.user, 2023, 10), 0)
+
+    def test_completion_is_a_single_query(self):
+        for level in range(40):
+            self.create_habit(expected_effort=5, level=level)
+
+        with self.assertNumQueries(1):
+            get_completion_percentage(self.user, 2023, 10)
+
+    def test_completion_view(self):
+        self.create_habit(expected_effort=2, level=1)
+
+        response = self.client.get("/api/completion/10/?year=2023")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"completion_percentage": 50})
+
+
+class CurrentPeriodTests(AuthenticatedTestCase):
+    def test_defaults_follow_the_current_iso_week(self):
+        # Monday of the first ISO week of 2025
+        with frozen_today(datetime.date(2024, 12, 30)):
+            habit = Habit()
+            effort = Effort()
+            response = self.client.get("/api/site-config/")
+
+        self.assertEqual((habit.year, habit.starting_week), (2025, 1))
+        self.assertEqual((effort.year, effort.week), (2025, 1))
+        self.assertEqual(response.data["current_week"], 1)
+
+    def test_habit_status(self):
+        habit = Habit.objects.create(
+            name="Habit",
+            user=self.user,
+            expected_effort=1,
+            starting_week=1,
+            ending_week=10,
+            year=2023,
+        )
+
+        with frozen_today(datetime.date(2023, 3, 6)):
+            self.assertEqual(HabitSerializer(habit).data["status"], "open")
+        with frozen_today(datetime.date(2024, 1, 8)):
+            self.assertEqual(HabitSerializer(habit).data["status"], "finished")
+
+
+class HabitAnalyticsTests(SimpleTestCase):
+    def setUp(self):
+        self.habits = [
+            Habit(id=1, expected_effort=2, starting_week=1),
+            Habit(id=2, expected_effort=3, starting_week=3),
+            Habit(id=3, expected_effort=2, starting_week=1, ending_week=2),
+        ]
+        self.matrix = analytics.HabitMatrix(
+            self.habits,
+            [(1, 1, 1), (1, 2, 1), (2, 3, 3), (2, 4, 1), (2, 4, 2), (3, 1, 2)],
+        )
+
+    def test_levels_are_summed_per_habit_and_week(self):
+        self.assertEqual(self.matrix.levels.shape, (3, 54))
+        self.assertEqual(self.matrix.levels[1, 4], 3)
+
+    def test_completion(self):
+        self.assertEqual(analytics.completion_percentage(self.matrix, 1), 75)
+        self.assertEqual(analytics.completion_percentage(self.matrix, 4), 50)
+        self.assertEqual(analytics.completion_percentage(self.matrix, 0), 0)
+
+    def test_rollup(self):
+        rows, points, performance, contribution = analytics.habit_rollup(
+            self.matrix, current_week=4
+        )
+
+        self.assertEqual(rows.tolist(), [0, 1, 2])
+        self.assertEqual(points.tolist(), [2, 6, 2])
+        self.assertEqual(performance.tolist(), [25, 100, 50])
+        self.assertEqual(contribution.tolist(), [20, 60, 20])
+
+    def test_habit_performance(self):
+        performance = compute_habit_performance(3, [(1, 1), (2, 3)])
+
+        self.assertEqual(
+            performance["performance_data"],
+            [
+                {"week": 1, "performance_percentage": 33.33},
+                {"week": 2, "performance_percentage": 100.0},
+            ],
+        )
+        self.assertEqual(performance["average_performance_percentage"], 66.67)
+        self.assertEqual(
+            compute_habit_performance(3, [])["average_performance_percentage"], 0
+        )
+
+
+class WeeklyCompletionTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.year = current_year()
+        self.current_week = current_week()
+
+    def completion(self, week):
+        return WeeklyCompletion.objects.get(user=self.user, year=self.year, week=week)
+
+    def create_habit(self, expected_effort, starting_week):
+        response = self.client.post(
+            "/api/habits/",
+            {
+                "name": "Habit",
+                "expected_effort": expected_effort,
+                "starting_week": starting_week,
+                "year": self.year,
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def create_effort(self, habit_id, week, level):
+        response = self.client.post(
+            "/api/efforts/",
+            {"habit": habit_id, "week": week, "level": level, "year": self.year},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def test_writes_keep_completions_up_to_date(self):
+        habit_id = self.create_habit(expected_effort=4, starting_week=2)
+        effort_id = self.create_effort(habit_id, week=3, level=2)
+
+        self.assertEqual(self.completion(1).expected_sum, 0)
+        self.assertEqual(self.completion(3).expected_sum, 4)
+        self.assertEqual(self.completion(3).actual_sum, 2)
+
+        self.client.patch(f"/api/efforts/{effort_id}/", {"week": 5}, format="json")
+        self.assertEqual(self.completion(3).actual_sum, 0)
+        self.assertEqual(self.completion(5).actual_sum, 2)
+
+        self.client.patch(f"/api/habits/{habit_id}/", {"expected_effort": 8})
+        self.assertEqual(self.completion(5).expected_sum, 8)
+
+        self.client.delete(f"/api/habits/{habit_id}/")
+        self.assertFalse(WeeklyCompletion.objects.exists())
+
+    def test_ended_habits_are_not_expected(self):
+        response = self.client.post(
+            "/api/habits/",
+            {
+                "name": "Habit",
+                "expected_effort": 4,
+                "starting_week": 1,
+                "ending_week": 3,
+                "year": self.year,
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.completion(3).expected_sum, 4)
+        self.assertEqual(self.completion(4).expected_sum, 0)
+
+    def test_rebuild_command(self):
+        habit = Habit.objects.create(
+            name="Habit",
+            user=self.user,
+            expected_effort=2,
+            starting_week=1,
+            year=self.year,
+        )
+        Effort.objects.create(
+            habit=habit, user=self.user, week=4, level=1, year=self.year
+        )
+
+        call_command("rebuild_weekly_completions", stdout=StringIO())
+
+        self.assertEqual(self.completion(4).completion_percentage, 50)
+        self.assertEqual(self.completion(5).completion_percentage, 0)
+
+    def test_recent_completions_is_a_lookup(self):
+        habit_id = self.create_habit(expected_effort=4, starting_week=1)
+        self.create_effort(habit_id, week=self.current_week, level=3)
+
+        # The token is cached by now, only the weekly completions lookup is left
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/completion/{self.current_week}/recent")
+
+        self.assertEqual(response.data[-1]["week"], self.current_week)
+        self.assertEqual(response.data[-1]["completion_percentage"], 75)
+
+    def test_recent_completions_go_back_into_the_previous_year(self):
+        for year, week in [(2022, 51), (2022, 52), (2023, 1), (2023, 2)]:
+            WeeklyCompletion.objects.create(
+                user=self.user,
+                year=year,
+                week=week,
+                period=year * 100 + week,
+                expected_sum=4,
+                actual_sum=week % 4,
+            )
+
+        # Monday of 2023's week 2
+        completions = get_recent_completions(self.user, datetime.date(2023, 1, 9))
+
+        self.assertEqual(
+            [(row["year"], row["week"]) for row in completions],
+            [(2022, 50), (2022, 51), (2022, 52), (2023, 1), (2023, 2)],
+        )
+        self.assertEqual(
+            [row["completion_percentage"] for row in completions], [0, 75, 0, 25, 50]
+        )
+
+    def test_period_keys_follow_year_and_week(self):
+        habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=2, starting_week=3, year=2023
+        )
+        effort = Effort.objects.create(
+            habit=habit, user=self.user, week=7, level=1, year=2023
+        )
+
+        self.assertEqual((habit.starting_period, habit.ending_period), (202303, 202353))
+        self.assertEqual(effort.period, 202307)
+
+        habit.ending_week = 10
+        habit.save()
+        self.assertEqual(habit.ending_period, 202310)
+
+    def test_duplicate_effort_is_rejected(self):
+        habit_id = self.create_habit(expected_effort=4, starting_week=1)
+        self.create_effort(habit_id, week=3, level=2)
+        effort_id = self.create_effort(habit_id, week=4, level=2)
+
+        response = self.client.post(
+            "/api/efforts/",
+            {"habit": habit_id, "week": 3, "level": 1, "year": self.year},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(f"/api/efforts/{effort_id}/", {"week": 3})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.completion(3).actual_sum, 2)
+
+
+class EffortBulkUpsertTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=4, starting_week=1, year=2023
+        )
+
+    def test_bulk_item_defaults_to_the_current_week(self):
+        with frozen_today(datetime.date(2023, 1, 20)):
+            response = self.client.post(
+                "/api/efforts/bulk/",
+                [{"habit": self.habit.id, "level": 1}],
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["status"], "ok")
+        self.assertEqual(
+            (response.data[0]["year"], response.data[0]["week"]), (2023, 3)
+        )
+        self.assertTrue(Effort.objects.filter(habit=self.habit, period=202303).exists())
+
+    def test_bulk_upsert(self):
+        effort = Effort.objects.create(
+            habit=self.habit, user=self.user, week=1, level=1, year=2023
+        )
+        other_habit = Habit.objects.create(
+            name="Habit",
+            user=User.objects.create_user(email="other@test.com", password="pass"),
+            expected_effort=4,
+        )
+
+        response = self.client.post(
+            "/api/efforts/bulk/",
+            [
+                {"habit": self.habit.id, "week": 1, "level": 3, "year": 2023},
+                {"habit": self.habit.id, "week": 2, "level": 2, "year": 2023},
+                {"habit": other_habit.id, "week": 2, "level": 2, "year": 2023},
+                {"habit": self.habit.id, "level": "high", "year": 2023},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.data],
+            ["ok", "ok", "error", "error"],
+        )
+        self.assertEqual(response.data[0]["id"], effort.id)
+        self.assertEqual(
+            dict(Effort.objects.filter(habit=self.habit).values_list("week", "level")),
+            {1: 3, 2: 2},
+        )
+        self.assertEqual(
+            WeeklyCompletion.objects.get(user=self.user, year=2023, week=1).actual_sum,
+            3,
+        )
+
+    def test_weeks_outside_their_year_are_rejected(self):
+        for week, year in [(0, 2023), (70, 2023), (150, 2023), (53, 2022)]:
+            response = self.client.post(
+                "/api/efforts/",
+                {"habit": self.habit.id, "week": week, "level": 1, "year": year},
+            )
+            self.assertEqual(response.status_code, 400, (week, year))
+
+        response = self.client.post(
+            "/api/efforts/bulk/",
+            [{"habit": self.habit.id, "week": 150, "level": 1, "year": 2023}],
+            format="json",
+        )
+        self.assertEqual(response.data[0]["status"], "error")
+
+        response = self.client.patch(
+            f"/api/habits/{self.habit.id}/", {"ending_week": 53}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Effort.objects.exists())
+
+    def test_period_keys_are_not_exposed(self):
+        self.client.post(
+            "/api/efforts/",
+            {"habit": self.habit.id, "week": 1, "level": 1, "year": 2023},
+        )
+
+        for path in ["/api/efforts/?year=2023", "/api/habits/?year=2023"]:
+            row = self.client.get(path).json()[0]
+            self.assertFalse({"period", "starting_period", "ending_period"} & set(row))
+            if "habit" in row:
+                self.assertNotIn("ending_period", row["habit"])
+
+    def test_bulk_upsert_query_count_is_constant(self):
+        efforts = [
+            {"habit": self.habit.id, "week": week, "level": 1, "year": 2023}
+            for week in range(1, 41)
+        ]
+
+        # Token authentication, ownership check, savepoint, upsert, completions refresh,
+        # savepoint release and ids
+        with self.assertNumQueries(9):
+            self.client.post("/api/efforts/bulk/", efforts, format="json")
+
+
+class EffortRepresentationTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        for expected_effort in range(1, 11):
+            habit = Habit.objects.create(
+                name="Habit",
+                user=self.user,
+                expected_effort=expected_effort,
+                starting_week=1,
+                year=2023,
+            )
+            for week in range(1, 4):
+                Effort.objects.create(
+                    habit=habit, user=self.user, week=week, level=1, year=2023
+                )
+
+    def test_habits_are_loaded_with_the_efforts(self):
+        # Token authentication and the efforts joined with their habits
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/efforts/?year=2023")
+
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(response.data[0]["habit"]["name"], "Habit")
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/efforts/week/2/?year=2023")
+
+        self.assertEqual(len(response.data), 10)
+
+    def test_plain_habit_ids(self):
+        response = self.client.get("/api/efforts/?year=2023&expand=")
+
+        self.assertIsInstance(response.data[0]["habit"], int)
+
+    def test_selected_fields(self):
+        response = self.client.get("/api/efforts/?year=2023&fields=id,week")
+
+        self.assertEqual(set(response.data[0]), {"id", "week"})
+
+    def test_values_serializers_match_model_serializers(self):
+        Habit.objects.filter(expected_effort__lte=5).update(
+            ending_week=2, ending_period=202302
+        )
+        habits = Habit.objects.order_by("id")
+        efforts = Effort.objects.order_by("id")
+
+        with frozen_today(datetime.date(2023, 1, 20)):
+            for context in [{}, {"expand": set()}, {"fields": ["id", "habit"]}]:
+                values_serializer = EffortValuesSerializer(context)
+                self.assertEqual(
+                    values_serializer.to_rows(values_serializer.get_values(efforts)),
+                    EffortSerializer(efforts, many=True, context=context).data,
+                )
+            self.assertEqual(
+                HabitValuesSerializer().to_rows(
+                    HabitValuesSerializer().get_values(habits)
+                ),
+                HabitSerializer(habits, many=True).data,
+            )
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            "user": {"date_joined": self.user.date_joined, "name": "Café\u2028\u2029"}
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class EffortListPaginationTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=1, starting_week=1, year=2023
+        )
+        for week in range(1, 8):
+            Effort.objects.create(
+                habit=habit, user=self.user, week=week, level=week, year=2023
+            )
+
+    def test_lists_are_not_paginated_by_default(self):
+        response = self.client.get("/api/efforts/?year=2023")
+
+        self.assertEqual(len(response.data), 7)
+
+    def test_cursor_pagination(self):
+        weeks = []
+        url = "/api/efforts/?year=2023&page_size=3"
+        while url:
+            response = self.client.get(url)
+            weeks += [effort["week"] for effort in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(weeks, list(range(1, 8)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/efforts/?page_size=3&cursor=invalid")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_values_of_the_wrong_type(self):
+        cursor = base64.urlsafe_b64encode(b'[{"a": 1}, 1, 1]').decode()
+        response = self.client.get(f"/api/efforts/?page_size=3&cursor={cursor}")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_ndjson_stream(self):
+        response = self.client.get("/api/efforts/?year=2023&stream=ndjson&expand=")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            sorted(json.loads(line)["level"] for line in lines), list(range(1, 8))
+        )
+
+
+class CachedTokenAuthenticationTests(AuthenticatedTestCase):
+    def test_token_is_cached(self):
+        self.client.get("/api/auth/user/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/auth/user/")
+
+        self.assertEqual(response.data["email"], self.user.email)
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get("/api/auth/user/")
+
+        token = Token.objects.get(user=self.user)
+        entry = cache.get(get_token_cache_key(token.key))
+        self.assertIsNotNone(entry)
+        self.assertNotIn(self.user.password, repr(entry))
+
+        # The deferred password is still loaded when it is checked
+        response = self.client.patch(
+            "/api/user/profile/", {"old_password": "pass", "first_name": "New"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_keyword(self):
+        token = Token.objects.get(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        # The Token keyword is only accepted by the default authentication
+        self.assertEqual(self.client.get("/api/tickets/").status_code, 200)
+        self.assertEqual(self.client.get("/api/auth/user/").status_code, 401)
+
+    def test_logout_invalidates_the_cached_token(self):
+        self.client.get("/api/auth/user/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get("/api/auth/user/").status_code, 401)
+
+    def test_password_change_invalidates_the_cached_token(self):
+        self.client.get("/api/auth/user/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                "/api/user/profile/",
+                {"old_password": "pass", "password": "new-pass"},
+            )
+
+        with self.assertNumQueries(1):
+            self.client.get("/api/auth/user/")
+
+    def test_profile_update_is_seen_by_the_next_request(self):
+        self.client.get("/api/auth/user/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                "/api/user/profile/", {"old_password": "pass", "first_name": "New"}
+            )
+
+        self.assertEqual(self.client.get("/api/auth/user/").data["first_name"], "New")
+
+    def test_demoted_staff_loses_access(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get("/api/backoffice/users/").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = False
+            self.user.save()
+
+        self.assertEqual(self.client.get("/api/backoffice/users/").status_code, 403)
+
+
+class CombinedRateThrottleTests(AuthenticatedTestCase):
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"anon": "2/hour", "ip": "3/hour", "user": None},
+        }
+    )
+    def test_requests_over_the_rate_are_rejected(self):
+        statuses = [self.client.get("/api/tickets/").status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+        # The ip counter is shared with anonymous requests
+        self.client.credentials()
+        self.assertEqual(self.client.post("/api/auth/login/").status_code, 429)
+
+
+class StreakAndTrendTests(AuthenticatedTestCase):
+    def create_efforts(self, habit, levels):
+        for (year, week), level in levels.items():
+            Effort.objects.create(
+                habit=habit, user=self.user, week=week, level=level, year=year
+            )
+
+    def test_streaks(self):
+        habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=2, starting_week=1, year=2022
+        )
+        # 2022 has 52 weeks and 2020 has 53, both streaks go on over new year
+        self.create_efforts(
+            habit,
+            {
+                (2020, 53): 2,
+                (2021, 1): 2,
+                (2022, 51): 2,
+                (2022, 52): 3,
+                (2023, 1): 2,
+                (2023, 2): 1,
+                (2023, 3): 2,
+            },
+        )
+        idle = Habit.objects.create(
+            name="Idle", user=self.user, expected_effort=1, starting_week=1, year=2023
+        )
+
+        with self.assertNumQueries(1):
+            streaks = get_habit_streaks(self.user, datetime.date(2023, 1, 23))
+
+        self.assertEqual(
+            streaks,
+            [
+                {"habit": habit.id, "current_streak": 1, "longest_streak": 3},
+                {"habit": idle.id, "current_streak": 0, "longest_streak": 0},
+            ],
+        )
+        self.assertEqual(
+            get_habit_streaks(self.user, datetime.date(2023, 2, 13))[0][
+                "current_streak"
+            ],
+            0,
+        )
+
+    def test_streaks_over_long_years_of_any_century(self):
+        habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=1, starting_week=1, year=2105
+        )
+        # 2105 has 53 weeks and 2106 has 52
+        self.create_efforts(
+            habit,
+            {(2105, 52): 1, (2105, 53): 1, (2106, 1): 1, (2106, 52): 1, (2107, 1): 1},
+        )
+
+        streaks = get_habit_streaks(
+            self.user, datetime.date.fromisocalendar(2107, 1, 3)
+        )
+
+        self.assertEqual(
+            streaks,
+            [{"habit": habit.id, "current_streak": 2, "longest_streak": 3}],
+        )
+
+    def test_streaks_view(self):
+        response = self.client.get("/api/performance/streaks/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_rolling_completions(self):
+        for week, actual_sum in enumerate([4, 2, 0, 2], start=1):
+            WeeklyCompletion.objects.create(
+                user=self.user,
+                year=2023,
+                week=week,
+                period=202300 + week,
+                expected_sum=4,
+                actual_sum=actual_sum,
+            )
+
+        with self.assertNumQueries(1):
+            completions = get_rolling_completions(self.user, 2023, window=2)
+
+        self.assertEqual(
+            [
+                (row["completion_percentage"], row["rolling_completion_percentage"])
+                for row in completions
+            ],
+            [(100, 100), (50, 75), (0, 25), (50, 25)],
+        )
+
+    def test_rolling_completions_window(self):
+        response = self.client.get("/api/completion/rolling/2023/?window=3")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get("/api/completion/rolling/2023/?window=0")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rolling_completions_year(self):
+        for year in [0, 99999]:
+            response = self.client.get(f"/api/completion/rolling/{year}/")
+            self.assertEqual(response.status_code, 400, year)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1, INSTRUMENTATION_QUERY_BUDGET=5)
+class InstrumentationTests(AuthenticatedTestCase):
+    def test_sampled_request_has_server_timing(self):
+        with self.assertLogs(level="INFO") as logs:
+            response = self.client.get("/api/habits/")
+
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="2 queries"')
+        self.assertIn("render;dur=", response["Server-Timing"])
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line["path"], "/api/habits/")
+        self.assertEqual(line["queries"], 2)
+
+    def test_request_over_budget_is_a_warning(self):
+        with override_settings(INSTRUMENTATION_QUERY_BUDGET=1):
+            with self.assertLogs(level="WARNING") as logs:
+                self.client.get("/api/habits/")
+
+        self.assertIn("Query budget exceeded", logs.output[-1])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.get("/api/habits/")
+
+        self.assertNotIn("Server-Timing", response)
+
+
+class QueryInspectionTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = Path(directory.name) / "queries.jsonl"
+        inspection = self.settings(QUERY_INSPECTION=True, QUERY_INSPECTION_LOG=self.log)
+        inspection.enable()
+        self.addCleanup(inspection.disable)
+
+    def test_sql_shape(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"
+            ),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_repeated_queries_are_reported_by_url_name(self):
+        self.user.is_staff = True
+        self.user.save()
+        for number in range(3):
+            User.objects.create_user(email=f"user{number}@test.com", password="pass")
+
+        self.client.get("/api/backoffice/users/")
+        self.client.get("/api/habits/")
+
+        reports = [json.loads(line) for line in self.log.read_text().splitlines()]
+        self.assertEqual(
+            [report["url_name"] for report in reports],
+            ["backoffice-user-list", "habit-list-create"],
+        )
+        self.assertGreaterEqual(reports[0]["repeated"][0]["count"], 4)
+        self.assertEqual(reports[1]["repeated"], [])
+
+        output = StringIO()
+        call_command("query_report", log=str(self.log), stdout=output)
+        self.assertIn("backoffice-user-list: 1 requests", output.getvalue())
+        self.assertIn("N+1: up to 4x in 1 requests", output.getvalue())
+
+
+class MetricsTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def test_requests_queries_and_caches_are_counted(self):
+        self.client.get("/api/habits/")
+        self.client.get("/api/habits/")
+        self.client.get("/api/performance/global/")
+        self.client.get("/api/performance/global/")
+
+        text = metrics.render()
+
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'url_name="habit-list-create"} 2',
+            text,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{url_name="habit-list-create"} 2',
+            text,
+        )
+        self.assertIn('db_queries_total{url_name="habit-list-create"} 3', text)
+        self.assertIn('cache_requests_total{cache="analytics",result="hit"} 1', text)
+        self.assertIn('cache_requests_total{cache="auth",result="miss"} 1', text)
+        self.assertIn('cache_requests_total{cache="throttle",result="miss"} 2', text)
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"ip": "1/hour", "user": "1/hour"},
+        }
+    )
+    def test_throttle_rejections_are_counted(self):
+        self.client.get("/api/habits/")
+        self.client.get("/api/habits/")
+
+        self.assertIn('throttle_rejections_total{scope="ip"} 1', metrics.render())
+
+    def test_metrics_endpoint(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.get("/api/backoffice/metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            "# TYPE http_request_duration_seconds histogram", response.content.decode()
+        )
+
+    def test_metrics_require_staff(self):
+        response = self.client.get("/api/backoffice/metrics/")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_metrics_of_every_worker_are_summed(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # An exited worker whose pid was given to this process
+        Path(directory.name, f"metrics-{os.getpid()}-exited.json").write_text(
+            json.dumps(
+                {
+                    "counters": [
+                        ["db_queries_total", {"url_name": "habit-list-create"}, 5]
+                    ],
+                    "histograms": [],
+                }
+            )
+        )
+
+        with self.settings(METRICS_DIR=directory.name):
+            self.client.get("/api/habits/")
+            text = metrics.render()
+
+        self.assertIn('db_queries_total{url_name="habit-list-create"} 7', text)
+        self.assertEqual(len(list(Path(directory.name).glob("metrics-*.json"))), 2)
+
+    def test_files_of_exited_workers_are_folded(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        exited = subprocess.run(
+            [sys.executable, "-c", "import os; print(os.getpid())"],
+            capture_output=True,
+            text=True,
+        )
+        snapshot = {
+            "counters": [["db_queries_total", {"url_name": "exited"}, 5]],
+            "histograms": [],
+        }
+        for name in ["first", "second"]:
+            Path(
+                directory.name, f"metrics-{exited.stdout.strip()}-{name}.json"
+            ).write_text(json.dumps(snapshot))
+
+        with self.settings(METRICS_DIR=directory.name):
+            texts = [metrics.render(), metrics.render()]
+            own_file = metrics._snapshot_path().name
+
+        for text in texts:
+            self.assertIn('db_queries_total{url_name="exited"} 10', text)
+        self.assertEqual(
+            sorted(path.name for path in Path(directory.name).glob("metrics-*.json")),
+            sorted([metrics.EXITED_FILE, own_file]),
+        )
+
+
+class ConditionalGetTests(AuthenticatedTestCase):
+    def test_public_features(self):
+        self.user.is_staff = True
+        self.user.save()
+        feature = Feature.objects.create(title="Dark mode")
+        client = APIClient()
+
+        response = client.get("/api/features/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = client.get("/api/features/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/backoffice/features/{feature.id}/", {"status": "live"}
+            )
+        response = client.get("/api/features/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["status"], "live")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_public_data_is_shared_between_processes(self):
+        Feature.objects.create(title="Dark mode")
+        get_public_features()
+        # Another process only has the shared tier
+        _local_public_data.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_public_features()["data"]), 1)
+
+    def test_public_site_config(self):
+        client = APIClient()
+
+        response = client.get("/api/site-config/")
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = client.get(
+                "/api/site-config/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_habit_list(self):
+        response = self.client.get("/api/habits/")
+        etag = response["ETag"]
+        self.assertIn("private", response["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/habits/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/habits/",
+                {"name": "Habit", "expected_effort": 1, "starting_week": 1},
+            )
+        response = self.client.get("/api/habits/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        # Other filters of the same list are other representations
+        response = self.client.get("/api/habits/?week=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ActiveAnnouncementTests(AuthenticatedTestCase):
+    def create_announcement(self, title, starting_date, end_date):
+        return Announcement.objects.create(
+            title=title,
+            content="",
+            type="info",
+            starting_date=datetime.date.fromisoformat(starting_date),
+            end_date=datetime.date.fromisoformat(end_date),
+        )
+
+    def get_titles(self, today):
+        with frozen_today(datetime.date.fromisoformat(today)):
+            response = APIClient().get("/api/announcements/active/")
+        self.assertEqual(response.status_code, 200)
+        return [announcement["title"] for announcement in response.data]
+
+    def test_active_announcements(self):
+        self.create_announcement("Past", "2023-02-01", "2023-02-20")
+        self.create_announcement("Running", "2023-03-01", "2023-03-10")
+        self.create_announcement("Upcoming", "2023-03-05", "2023-03-20")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_titles("2023-03-03"), ["Running"])
+        # Cached until the upcoming one starts
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_titles("2023-03-04"), ["Running"])
+
+        self.assertEqual(self.get_titles("2023-03-05"), ["Running", "Upcoming"])
+        self.assertEqual(self.get_titles("2023-03-11"), ["Upcoming"])
+        self.assertEqual(self.get_titles("2023-03-21"), [])
+
+    def test_writes_invalidate_active_announcements(self):
+        self.user.is_staff = True
+        self.user.save()
+        announcement = self.create_announcement("Banner", "2023-03-01", "2023-03-10")
+        self.assertEqual(self.get_titles("2023-03-03"), ["Banner"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/backoffice/announcements/{announcement.id}/",
+                {"end_date": "2023-03-02"},
+            )
+
+        self.assertEqual(self.get_titles("2023-03-03"), [])
+
+
+class DashboardTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        year = current_year()
+        self.current_week = current_week()
+        for index in range(20):
+            habit = Habit.objects.create(
+                name=f"Habit {index}",
+                user=self.user,
+                expected_effort=index % 5,
+                starting_week=max(1, self.current_week - index),
+                ending_week=self.current_week - 1 if index % 7 == 0 else None,
+                year=year,
+            )
+            for week in range(habit.starting_week, self.current_week + 1, 2):
+                Effort.objects.create(
+                    habit=habit,
+                    user=self.user,
+                    week=week,
+                    level=index % 4,
+                    year=year,
+                )
+        call_command("rebuild_weekly_completions", stdout=StringIO())
+
+    def test_dashboard_matches_the_widget_endpoints(self):
+        week = self.current_week
+        response = self.client.get(f"/api/dashboard/{week}/")
+
+        self.assertEqual(response.status_code, 200)
+        widgets = {
+            "site_config": "/api/site-config/",
+            "habits": "/api/habits/",
+            "efforts": f"/api/efforts/week/{week}/",
+            "completion": f"/api/completion/{week}/",
+            "recent_completions": f"/api/completion/{week}/recent",
+            "global_performance": "/api/performance/global/",
+        }
+        for name, url in widgets.items():
+            expected = self.client.get(url).json()
+            if name == "efforts":
+                expected.sort(key=lambda effort: effort["id"])
+            if name == "completion":
+                self.assertAlmostEqual(
+                    response.json()[name]["completion_percentage"],
+                    expected["completion_percentage"],
+                )
+                continue
+            self.assertEqual(response.json()[name], expected, name)
+
+    def test_dashboard_query_budget(self):
+        # Token authentication, the habits, their efforts and the weekly
+        # completions lookup of the recent completions
+        with self.assertNumQueries(4):
+            self.client.get(f"/api/dashboard/{self.current_week}/")
+
+
+class AnalyticsCacheTests(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=4, starting_week=1
+        )
+
+    def test_cached_responses_skip_the_database(self):
+        urls = [
+            "/api/completion/10/",
+            "/api/completion/10/recent",
+            f"/api/performance/{self.habit.id}/",
+            "/api/performance/global/",
+        ]
+        responses = [self.client.get(url).data for url in urls]
+
+        for url, data in zip(urls, responses):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).data, data)
+
+    def test_writes_invalidate_cached_responses(self):
+        self.assertEqual(
+            self.client.get("/api/completion/10/").data["completion_percentage"],
+            0,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/efforts/",
+                {
+                    "habit": self.habit.id,
+                    "week": 10,
+                    "level": 2,
+                    "year": self.habit.year,
+                },
+            )
+
+        self.assertEqual(
+            self.client.get("/api/completion/10/").data["completion_percentage"],
+            50,
+        )
+
+    def test_generation_is_bumped_after_commit(self):
+        generation = get_generation(self.user)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(
+                "/api/efforts/bulk/",
+                [{"habit": self.habit.id, "week": 10, "level": 2}],
+                format="json",
+            )
+            # A read before the commit still sees the old generation
+            self.assertEqual(get_generation(self.user), generation)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_generation(self.user), generation)
+
+    def test_cache_is_per_user(self):
+        other_user = User.objects.create_user(email="other@test.com", password="pass")
+        Habit.objects.create(
+            name="Habit", user=other_user, expected_effort=4, starting_week=1
+        )
+        self.client.get("/api/performance/global/")
+
+        self.client.force_authenticate(other_user)
+        response = self.client.get("/api/performance/global/")
+
+        self.assertEqual(response.data[0]["habit"]["user"], other_user.id)
+
+
+class AsyncAnalyticsTests(TransactionTestCase):
+    # Async views query from other threads, which need committed data
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="user@test.com", password="pass")
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.key}")
+        self.habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=4, starting_week=1
+        )
+        self.client.post(
+            "/api/efforts/",
+            {"habit": self.habit.id, "week": 1, "level": 3, "year": self.habit.year},
+        )
+
+    def test_async_views_match_sync_views(self):
+        for path in [
+            "completion/1/",
+            "completion/1/recent",
+            f"performance/{self.habit.id}/",
+            "performance/global/",
+        ]:
+            expected = self.client.get(f"/api/{path}").json()
+            cache.clear()
+
+            response = self.client.get(f"/api/async/{path}")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), expected)
+
+    def test_asgi_application_warms_public_data_on_startup(self):
+        _local_public_data.clear()
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def serve():
+            # Servers such as uvicorn import the application inside their loop
+            asgi = importlib.reload(importlib.import_module("app.asgi"))
+            await asgi.application({"type": "lifespan"}, receive, send)
+
+        asyncio.run(serve())
+
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+        self.assertIn("features", _local_public_data)
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"anon": None, "ip": None, "user": "1/hour"},
+        }
+    )
+    def test_throttled_requests_say_when_to_retry(self):
+        cache.clear()
+        self.client.get("/api/async/completion/1/")
+
+        response = self.client.get("/api/async/completion/1/")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    def test_async_views_require_authentication(self):
+        self.client.credentials()
+
+        response = self.client.get("/api/async/completion/1/")
+
+        self.assertEqual(response.status_code, 401)
+
+
+class EndpointBenchmarkTests(TransactionTestCase):
+    # Async views query from other threads, which need committed data
+
+    def test_every_route_is_benchmarked(self):
+        self.assertLessEqual(
+            benchmarks.routes(),
+            {scenario.route for scenario in benchmarks.SCENARIOS},
+        )
+
+    def test_query_counts_within_baselines(self):
+        baselines = json.loads(BASELINES.read_text())["results"]
+
+        results = benchmarks.benchmark(habits=3, years=2, iterations=1)
+
+        self.assertEqual(results.keys(), baselines.keys())
+        for name, result in results.items():
+            with self.subTest(name):
+                self.assertLessEqual(result["queries"], baselines[name]["queries"])
+
+
+@skipUnless(connection.vendor == "postgresql", "Query plans are Postgres specific")
+class HotQueryPlanTests(TestCase):
+    """
+    The hot queries of the analytics endpoints must use the composite index
+    made for them. The foreign key indexes would also avoid a sequential scan,
+    so the plans are checked for the name of the expected index. Sequential
+    scans are disabled so the planner picks an index on the empty tables.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@test.com", password="pass")
+        self.habit = Habit.objects.create(
+            name="Habit", user=self.user, expected_effort=1, starting_week=1, year=2023
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_effort_by_user_period_range(self):
+        self.assertUsesIndex(
+            Effort.objects.filter(
+                user=self.user, period__range=(202250, 202310)
+            ).values("level"),
+            "effort_user_period_idx",
+        )
+
+    def test_effort_by_habit_week(self):
+        self.assertUsesIndex(
+            Effort.objects.filter(habit=self.habit, week__lte=10), "unique_effort"
+        )
+
+    def test_habit_by_user_year_starting_week(self):
+        self.assertUsesIndex(
+            Habit.objects.filter(user=self.user, year=2023, starting_week__lte=10),
+            "habit_user_year_week_idx",
+        )
+
+    def test_active_habits_by_period(self):
+        self.assertUsesIndex(active_habits(self.user, 202310), "habit_user_period_idx")
+
+    def test_active_announcements(self):
+        today = datetime.date(2023, 3, 3)
+        self.assertUsesIndex(
+            Announcement.objects.filter(starting_date__lte=today, end_date__gte=today),
+            "announcement_dates_idx",
+        )
+
+    def test_weekly_completion_lookup(self):
+        self.assertUsesIndex(
+            WeeklyCompletion.objects.filter(
+                user=self.user, period__range=(202250, 202310)
+            ),
+            "unique_weekly_completion",
+        )
@@ -1,18 +1,56 @@
-import datetime
+import json
 from rest_framework.views import APIView
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
-from django.db.models import F, Q, Sum
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
 from rest_framework import generics, status, permissions
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from app import metrics
 from .auth import BearerTokenAuthentication
+from . import periods
+from .periods import LAST_WEEK, from_period, to_period
+from .pagination import EffortPagination, HabitPagination
+from .renderers import FastJSONRenderer
 from .models import Habit, Effort, Ticket, Announcement, Feature
+from .cache import cached_analytics
+from .conditional import (
+    public_data_condition,
+    table_condition,
+    user_data_condition,
+)
+from .services import (
+    get_completion_percentage,
+    get_dashboard,
+    get_active_announcements,
+    get_habit_performance,
+    get_public_features,
+    get_site_config,
+    get_habit_streaks,
+    get_recent_completions,
+    get_rolling_completions,
+    get_yearly_habit_performance,
+    on_announcements_changed,
+    on_efforts_changed,
+    on_features_changed,
+    on_habits_changed,
+)
 from .serializers import (
     HabitSerializer,
+    HabitValuesSerializer,
     EffortSerializer,
+    EffortValuesSerializer,
+    EffortBulkItemSerializer,
     UserSerializer,
     UserRegistrationSerializer,
     TicketSerializer,
@@ -24,13 +62,97 @@ from .serializers import (
 User = get_user_model()
 
 
-class HabitListCreateView(generics.ListCreateAPIView):
+class EffortRepresentationMixin:
+    """
+    Lets effort lists pick their representation through query params:
+    ?fields=id,week,level to only return some fields and ?expand= to return
+    plain habit ids instead of nested habits (?expand=habit is the default).
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+
+        if self.request.method == "GET":
+            fields = self.request.query_params.get("fields")
+            if fields:
+                context["fields"] = fields.split(",")
+
+            expand = self.request.query_params.get("expand")
+            if expand is not None:
+                context["expand"] = set(filter(None, expand.split(",")))
+
+        return context
+
+    def get_effort_queryset(self, queryset):
+        if self.get_serializer().expand_habit:
+            return queryset.select_related("habit")
+        return queryset
+
+
+class StreamingListMixin:
+    """
+    Lets a list be streamed as newline delimited JSON with ?stream=ndjson.
+    Rows are fetched in chunks and serialized one by one, so exporting a long
+    history runs in constant memory.
+    """
+
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("stream") != "ndjson":
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+
+        def lines():
+            for instance in queryset.iterator(chunk_size=self.stream_chunk_size):
+                representation = serializer.to_representation(instance)
+                yield json.dumps(representation, cls=JSONEncoder) + "\n"
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+
+class ValuesListMixin:
+    """
+    Lists rows read with values() and shaped by the values_serializer_class of
+    the view, a read only copy of its serializer with the same output, instead
+    of serializing model instances. Writes still go through serializer_class.
+    """
+
+    def get_values_serializer(self):
+        try:
+            serializer_class = self.values_serializer_class
+        except AttributeError:
+            raise ImproperlyConfigured(
+                f"{self.__class__.__name__} should set values_serializer_class."
+            ) from None
+        return serializer_class(context=self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_values_serializer()
+        queryset = serializer.get_values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_rows(page))
+        return Response(serializer.to_rows(queryset))
+
+
+@method_decorator(cache_control(private=True, no_cache=True), name="get")
+@method_decorator(user_data_condition, name="get")
+class HabitListCreateView(
+    StreamingListMixin, ValuesListMixin, generics.ListCreateAPIView
+):
     serializer_class = HabitSerializer
+    values_serializer_class = HabitValuesSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     authentication_classes = [BearerTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = HabitPagination
 
     def get_queryset(self):
-        year = self.request.query_params.get("year", datetime.date.today().year)
+        year = self.request.query_params.get("year", periods.current_year())
         week = self.request.query_params.get("week", None)
 
         query = Q(year=year) & Q(user=self.request.user)
@@ -44,7 +166,8 @@ class HabitListCreateView(generics.ListCreateAPIView):
         )
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        habit = serializer.save(user=self.request.user)
+        on_habits_changed(self.request.user, habit.year)
 
 
 class HabitRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -55,27 +178,48 @@ class HabitRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Habit.objects.filter(user=self.request.user)
 
+    def perform_update(self, serializer):
+        previous_year = serializer.instance.year
+        habit = serializer.save()
+        on_habits_changed(self.request.user, previous_year, habit.year)
 
-class EffortListCreateView(generics.ListCreateAPIView):
+    def perform_destroy(self, instance):
+        instance.delete()
+        on_habits_changed(self.request.user, instance.year)
+
+
+@method_decorator(cache_control(private=True, no_cache=True), name="get")
+@method_decorator(user_data_condition, name="get")
+class EffortListCreateView(
+    EffortRepresentationMixin,
+    StreamingListMixin,
+    ValuesListMixin,
+    generics.ListCreateAPIView,
+):
     serializer_class = EffortSerializer
+    values_serializer_class = EffortValuesSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     authentication_classes = [BearerTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = EffortPagination
 
     def get_queryset(self):
-        year = self.request.query_params.get("year", datetime.date.today().year)
-        return Effort.objects.filter(Q(year=year) & Q(user=self.request.user))
-
-    def create(self, request, *args, **kwargs):
-        habit = request.data.get("habit")
-        week = request.data.get("week")
+        year = int(self.request.query_params.get("year", periods.current_year()))
+        return self.get_effort_queryset(
+            Effort.objects.filter(
+                user=self.request.user,
+                period__range=(to_period(year, 1), to_period(year, LAST_WEEK)),
+            )
+        )
 
-        if Effort.objects.filter(habit=habit, week=week, user=request.user).exists():
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                effort = serializer.save(user=self.request.user)
+        except IntegrityError:
             raise ValidationError("Effort already set for that week and habit.")
 
-        return super().create(request, *args, **kwargs)
-
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        on_efforts_changed(self.request.user, (effort.year, effort.week))
 
 
 class EffortRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -84,19 +228,131 @@ class EffortRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Effort.objects.filter(user=self.request.user)
+        return Effort.objects.filter(user=self.request.user).select_related("habit")
+
+    def perform_update(self, serializer):
+        previous_period = (serializer.instance.year, serializer.instance.week)
+        try:
+            with transaction.atomic():
+                effort = serializer.save()
+        except IntegrityError:
+            raise ValidationError("Effort already set for that week and habit.")
+
+        on_efforts_changed(
+            self.request.user, previous_period, (effort.year, effort.week)
+        )
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        on_efforts_changed(self.request.user, (instance.year, instance.week))
 
-class EffortListByWeekView(generics.ListAPIView):
+
+class EffortBulkUpsertView(APIView):
+    """
+    Create or update a list of efforts in one request, answering with a result
+    per item in the same order as the request.
+    """
+
+    authentication_classes = [BearerTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    max_items = 500
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError("Expected a list of efforts.")
+        if len(request.data) > self.max_items:
+            raise ValidationError(f"Cannot log more than {self.max_items} efforts.")
+
+        results = []
+        valid_items = {}
+        for index, item in enumerate(request.data):
+            serializer = EffortBulkItemSerializer(data=item)
+            if serializer.is_valid():
+                valid_items[index] = serializer.validated_data
+                results.append(None)
+            else:
+                results.append(
+                    {"index": index, "status": "error", "errors": serializer.errors}
+                )
+
+        owned_habits = set(
+            Habit.objects.filter(
+                user=request.user,
+                id__in={item["habit"] for item in valid_items.values()},
+            ).values_list("id", flat=True)
+        )
+
+        # The last item logged for a habit and week wins
+        efforts = {}
+        for index, item in valid_items.items():
+            if item["habit"] not in owned_habits:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "errors": {"habit": [f'Invalid pk "{item["habit"]}".']},
+                }
+                continue
+            key = (item["habit"], item["week"], item["year"])
+            efforts[key] = Effort(
+                habit_id=item["habit"],
+                week=item["week"],
+                year=item["year"],
+                period=to_period(item["year"], item["week"]),
+                level=item["level"],
+                user=request.user,
+            )
+
+        if efforts:
+            with transaction.atomic():
+                Effort.objects.bulk_create(
+                    efforts.values(),
+                    update_conflicts=True,
+                    unique_fields=["habit", "week", "year", "user"],
+                    update_fields=["level"],
+                )
+                on_efforts_changed(
+                    request.user, *{(year, week) for _, week, year in efforts}
+                )
+
+            effort_ids = {
+                (habit_id, week, year): effort_id
+                for effort_id, habit_id, week, year in Effort.objects.filter(
+                    user=request.user,
+                    habit_id__in={habit_id for habit_id, _, _ in efforts},
+                    period__in={to_period(year, week) for _, week, year in efforts},
+                ).values_list("id", "habit_id", "week", "year")
+            }
+
+        for index, item in valid_items.items():
+            if results[index] is None:
+                key = (item["habit"], item["week"], item["year"])
+                results[index] = {
+                    "index": index,
+                    "status": "ok",
+                    "id": effort_ids[key],
+                    "habit": item["habit"],
+                    "week": item["week"],
+                    "year": item["year"],
+                    "level": efforts[key].level,
+                }
+
+        return Response(results)
+
+
+class EffortListByWeekView(
+    EffortRepresentationMixin, ValuesListMixin, generics.ListAPIView
+):
     serializer_class = EffortSerializer
+    values_serializer_class = EffortValuesSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     authentication_classes = [BearerTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         week = self.kwargs["week"]
-        year = self.request.query_params.get("year", datetime.date.today().year)
-        return Effort.objects.filter(
-            Q(week=week) & Q(year=year) & Q(user=self.request.user)
+        year = int(self.request.query_params.get("year", periods.current_year()))
+        return self.get_effort_queryset(
+            Effort.objects.filter(user=self.request.user, period=to_period(year, week))
         )
 
 
@@ -168,48 +424,19 @@ class EffortCompletionView(APIView):
 
     def get(self, request, *args, **kwargs):
         week = self.kwargs["week"]
-        user = request.user
-
-        habits = Habit.objects.filter(
-            user=user,
-            starting_week__lte=week,
-            ending_week__isnull=True,  # Habits that don't have an ending_week
-        ).union(
-            Habit.objects.filter(
-                user=user,
-                starting_week__lte=week,
-                ending_week__gte=week,  # Habits that ended during or after the requested week
-            )
+        year = int(self.request.query_params.get("year", periods.current_year()))
+        data = cached_analytics(
+            request.user,
+            "completion",
+            {"year": year, "week": week},
+            lambda: {
+                "completion_percentage": get_completion_percentage(
+                    request.user, year, week
+                )
+            },
         )
 
-        total_percentage = 0
-
-        for habit in habits:
-            expected_effort = habit.expected_effort
-
-            # Get the total actual effort for the week for this habit
-            total_actual_effort = (
-                Effort.objects.filter(user=user, week=week, habit=habit).aggregate(
-                    Sum("level")
-                )["level__sum"]
-                or 0
-            )
-
-            # Calculate the completion percentage for this habit
-            if total_actual_effort >= expected_effort:
-                completion_percentage = 100
-            else:
-                completion_percentage = (total_actual_effort / expected_effort) * 100
-
-            total_percentage += completion_percentage
-
-        # Calculate the average completion percentage
-        if habits:
-            average_completion_percentage = total_percentage / len(habits)
-        else:
-            average_completion_percentage = 0
-
-        return Response({"completion_percentage": average_completion_percentage})
+        return Response(data)
 
 
 class HabitPerformanceView(generics.ListAPIView):
@@ -217,51 +444,17 @@ class HabitPerformanceView(generics.ListAPIView):
     authentication_classes = [BearerTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        habit_id = self.kwargs["habit_id"]
-        return Effort.objects.filter(habit_id=habit_id, user=self.request.user)
-
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        habit = Habit.objects.get(id=self.kwargs["habit_id"], user=request.user)
-
-        performance_data = []
-        total_performance_percentage = 0
-        for effort in queryset:
-            expected_effort = habit.expected_effort
-            actual_effort = effort.level
-
-            # Calculate the performance percentage for the week
-            if expected_effort > 0:
-                performance_percentage = (actual_effort / expected_effort) * 100
-            else:
-                performance_percentage = 0
-
-            total_performance_percentage += performance_percentage
-
-            performance_data.append(
-                {
-                    "week": effort.week,
-                    "performance_percentage": round(performance_percentage, 2),
-                }
-            )
-
-        if queryset.count() > 0:
-            average_performance_percentage = (
-                total_performance_percentage / queryset.count()
-            )
-        else:
-            average_performance_percentage = 0
-
-        return Response(
-            {
-                "performance_data": performance_data,
-                "average_performance_percentage": round(
-                    average_performance_percentage, 2
-                ),
-            }
+        habit_id = self.kwargs["habit_id"]
+        data = cached_analytics(
+            request.user,
+            "performance",
+            {"habit_id": habit_id},
+            lambda: get_habit_performance(request.user, habit_id),
         )
 
+        return Response(data)
+
 
 class YearlyHabitPerformanceView(generics.ListAPIView):
     serializer_class = HabitSerializer
@@ -269,160 +462,138 @@ class YearlyHabitPerformanceView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        current_week = datetime.date.today().isocalendar()[1]
-        habits = Habit.objects.filter(
-            user=self.request.user, starting_week__lte=current_week
+        current_period = periods.current_period()
+        data = cached_analytics(
+            request.user,
+            "yearly-performance",
+            {"current_period": current_period},
+            lambda: get_yearly_habit_performance(request.user, current_period),
         )
-        habit_performance = []
-
-        total_effort_points = 0
-        for habit in habits:
-            ending_week = habit.ending_week if habit.ending_week else current_week
-            ending_week = min(ending_week, current_week)
-
-            effort_points = (
-                Effort.objects.filter(habit=habit, week__lte=ending_week).aggregate(
-                    Sum("level")
-                )["level__sum"]
-                or 0
-            )
-            total_effort_points += effort_points
 
-        for habit in habits:
-            ending_week = habit.ending_week if habit.ending_week else current_week
-            ending_week = min(ending_week, current_week)
+        return Response(data)
 
-            habit_effort_points = (
-                Effort.objects.filter(habit=habit, week__lte=ending_week).aggregate(
-                    Sum("level")
-                )["level__sum"]
-                or 0
-            )
-            weeks_since_start = ending_week - habit.starting_week + 1
-            performance_percentage = 0
-            if habit.expected_effort > 0:
-                performance_percentage = (
-                    habit_effort_points / (habit.expected_effort * weeks_since_start)
-                ) * 100
-            contribution_percentage = 0
-            if total_effort_points > 0:
-                contribution_percentage = (
-                    habit_effort_points / total_effort_points
-                ) * 100
-
-            habit_performance.append(
-                {
-                    "habit": HabitSerializer(habit).data,
-                    "performance_percentage": round(performance_percentage, 2),
-                    "contribution_percentage": round(contribution_percentage, 2),
-                }
-            )
 
-        # Sort the habit_performance list by contribution_percentage in descending order
-        habit_performance = sorted(
-            habit_performance, key=lambda k: k["contribution_percentage"], reverse=True
+class RecentCompletionsView(APIView):
+    authentication_classes = [BearerTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        today = periods.today()
+        data = cached_analytics(
+            request.user,
+            "recent-completions",
+            {"today": today},
+            lambda: get_recent_completions(request.user, today),
         )
 
-        return Response(habit_performance)
+        return Response(data)
 
 
-class RecentCompletionsView(APIView):
+class HabitStreaksView(APIView):
+    """
+    API endpoint that returns the current and longest streak of every habit
+    """
+
     authentication_classes = [BearerTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def get_completion_percentage(self, user, week):
-        # Get the total expected effort for the week for habits that started on or before the week
-        total_expected_effort = (
-            Habit.objects.filter(user=user, starting_week__lte=week).aggregate(
-                Sum("expected_effort")
-            )["expected_effort__sum"]
-            or 0
+    def get(self, request, *args, **kwargs):
+        today = periods.today()
+        data = cached_analytics(
+            request.user,
+            "streaks",
+            {"today": today},
+            lambda: get_habit_streaks(request.user, today),
         )
 
-        # Get the total actual effort for the week
-        total_actual_effort = (
-            Effort.objects.filter(user=user, week=week).aggregate(Sum("level"))[
-                "level__sum"
-            ]
-            or 0
-        )
+        return Response(data)
 
-        # Calculate the completion percentage
-        if total_expected_effort > 0:
-            return round((total_actual_effort / total_expected_effort) * 100, 2)
-        else:
-            return 0
 
-    def get(self, request, *args, **kwargs):
-        user = request.user
-        current_week = datetime.date.today().isocalendar()[1]
+class RollingCompletionsView(APIView):
+    """
+    API endpoint that returns the weekly completions of a year with their
+    rolling average over ?window= weeks (4 by default)
+    """
 
-        response = []
+    authentication_classes = [BearerTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    default_window = 4
 
-        # Calculate completion percentages and differences for the current week and the 4 previous weeks
-        for i, week in enumerate(range(current_week - 4, current_week + 1)):
-            completion_percentage = self.get_completion_percentage(user, week)
+    def get(self, request, *args, **kwargs):
+        year = self.get_year()
+        window = self.get_window()
+        current_year, current_week = from_period(periods.current_period())
+        # Weeks after the current one have no completion yet
+        last_week = current_week if year == current_year else None
+        data = cached_analytics(
+            request.user,
+            "rolling-completions",
+            {"year": year, "window": window, "last_week": last_week},
+            lambda: get_rolling_completions(request.user, year, window, last_week),
+        )
 
-            if i > 0:
-                difference = round(
-                    completion_percentage - response[i - 1]["completion_percentage"], 2
-                )
-            else:
-                difference = 0
+        return Response(data)
 
-            response.append(
+    def get_year(self):
+        year = self.kwargs["year"]
+        if not periods.MIN_YEAR <= year <= periods.MAX_YEAR:
+            raise ValidationError(
                 {
-                    "week": week,
-                    "completion_percentage": completion_percentage,
-                    "difference": difference,
+                    "year": f"Must be a year from {periods.MIN_YEAR} "
+                    f"to {periods.MAX_YEAR}."
                 }
             )
+        return year
 
-        return Response(response)
-
-    def get(self, request, *args, **kwargs):
-        user = request.user
-        current_week = datetime.date.today().isocalendar()[1]
+    def get_window(self):
+        window = self.request.query_params.get("window", self.default_window)
+        try:
+            window = int(window)
+        except (TypeError, ValueError):
+            window = 0
+        if not 1 <= window <= 53:
+            raise ValidationError({"window": "Must be a number of weeks from 1 to 53."})
+        return window
 
-        response = []
 
-        # Calculate completion percentages and differences for the current week and the 4 previous weeks
-        for i, week in enumerate(range(current_week - 4, current_week + 1)):
-            completion_percentage = self.get_completion_percentage(user, week)
+class DashboardView(APIView):
+    """
+    API endpoint that returns every widget of the home screen at once
+    """
 
-            if i > 0:
-                difference = round(
-                    completion_percentage - response[i - 1]["completion_percentage"], 2
-                )
-            else:
-                difference = 0
+    authentication_classes = [BearerTokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
-            response.append(
-                {
-                    "week": week,
-                    "completion_percentage": completion_percentage,
-                    "difference": difference,
-                }
-            )
+    def get(self, request, *args, **kwargs):
+        week = self.kwargs["week"]
+        today = periods.today()
+        current_year, _ = from_period(periods.period_of(today))
+        year = int(self.request.query_params.get("year", current_year))
+        data = cached_analytics(
+            request.user,
+            "dashboard",
+            {"week": week, "year": year, "today": today},
+            lambda: get_dashboard(request.user, week, year, today),
+        )
 
-        return Response(response)
+        return Response(data)
 
 
+@method_decorator(
+    cache_control(public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE), name="get"
+)
+@method_decorator(public_data_condition(get_site_config), name="get")
 class SiteConfigView(APIView):
     """
     API endpoint that returns site-wide configuration data
     """
 
-    def get(self, request, format=None):
-        # You can get the current week number using datetime.date.today().isocalendar()[1]
-        current_week = datetime.date.today().isocalendar()[1]
-
-        # Later, you can add more global variables here
-        data = {
-            "current_week": current_week,
-        }
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
 
-        return Response(data)
+    def get(self, request, format=None):
+        # Global variables are added in services.get_site_config()
+        return Response(get_site_config()["data"])
 
 
 class UserUpdateView(generics.UpdateAPIView):
@@ -434,6 +605,20 @@ class UserUpdateView(generics.UpdateAPIView):
         return self.request.user
 
 
+class MetricsView(APIView):
+    """
+    Request, database and cache metrics of every worker in the Prometheus text
+    exposition format
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        return HttpResponse(
+            metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
 class UserListView(generics.ListAPIView):
     serializer_class = UserListSerializer
     permission_classes = [permissions.IsAdminUser]
@@ -477,6 +662,7 @@ class TicketRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Ticket.objects.all()
 
 
+@method_decorator(table_condition(Announcement, daily=True), name="get")
 class AnnouncementListCreateView(generics.ListCreateAPIView):
     serializer_class = AnnouncementSerializer
     permission_classes = [permissions.IsAdminUser]
@@ -485,12 +671,44 @@ class AnnouncementListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return Announcement.objects.all()
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        on_announcements_changed()
+
 
 class AnnouncementRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AnnouncementSerializer
     permission_classes = [permissions.IsAdminUser]
     queryset = Announcement.objects.all()
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        on_announcements_changed()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        on_announcements_changed()
+
+
+def _get_active_announcements():
+    return get_active_announcements(periods.today())
+
+
+@method_decorator(
+    cache_control(public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE), name="get"
+)
+@method_decorator(public_data_condition(_get_active_announcements), name="get")
+class ActiveAnnouncementListView(APIView):
+    """
+    API endpoint that returns the announcements running today
+    """
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, format=None):
+        return Response(_get_active_announcements()["data"]["results"])
+
 
 class FeatureListCreateView(generics.ListCreateAPIView):
     serializer_class = FeatureSerializer
@@ -500,12 +718,24 @@ class FeatureListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return Feature.objects.all()
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        on_features_changed()
+
 
 class FeatureRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FeatureSerializer
     permission_classes = [permissions.IsAdminUser]
     queryset = Feature.objects.all()
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        on_features_changed()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        on_features_changed()
+
 
 class UserTicketListView(generics.ListAPIView):
     serializer_class = TicketSerializer
@@ -522,8 +752,17 @@ class UserTicketListView(generics.ListAPIView):
         return Ticket.objects.filter(sender=user.email)
 
 
+@method_decorator(
+    cache_control(public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE), name="get"
+)
+@method_decorator(public_data_condition(get_public_features), name="get")
 class PublicFeatureListView(generics.ListAPIView):
     serializer_class = FeatureSerializer
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        return Feature.objects
+        return Feature.objects.order_by("id")
+
+    def list(self, request, *args, **kwargs):
+        return Response(get_public_features()["data"])
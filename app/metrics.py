@@ -0,0 +1,241 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+
+# Name -> (type, help) of every metric, in the order they are exposed
+METRICS = {
+    "http_requests_total": (
+        "counter",
+        "Responses by URL name, method and status.",
+    ),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time to answer a request by URL name.",
+    ),
+    "db_queries_total": ("counter", "Database queries by URL name."),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result."),
+    "throttle_rejections_total": ("counter", "Requests throttled by scope."),
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Registry(object):
+    """
+    Counters and histograms of this process, keyed by name and labels.
+    Histograms hold the count of every bucket, the sum and the count.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+            self.flushed_at = 0
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * len(DURATION_BUCKETS) + [0, 0]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    [name, dict(labels), list(values)]
+                    for (name, labels), values in self.histograms.items()
+                ],
+            }
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+
+
+# Suffix of the snapshot file of this process, unique even when a pid is reused
+_process_id = uuid.uuid4().hex
+
+
+def _after_fork():
+    # A forked worker starts from zero in a file of its own, what it inherited
+    # is still counted in the file of its parent
+    global _process_id
+    _process_id = uuid.uuid4().hex
+    registry.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _snapshot_path():
+    return Path(settings.METRICS_DIR) / f"metrics-{os.getpid()}-{_process_id}.json"
+
+
+def flush(force=False):
+    """
+    Write the metrics of this process to METRICS_DIR, at most once every
+    METRICS_FLUSH_INTERVAL seconds unless forced, so that any worker can
+    expose the metrics of all of them.
+    """
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - registry.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+        return
+    registry.flushed_at = now
+
+    _write(_snapshot_path(), registry.snapshot())
+
+
+def _write(path, snapshot):
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(snapshot))
+    # Readers never see a partly written file
+    os.replace(temporary, path)
+
+
+# Snapshot summing up the processes that exited, see _fold_exited()
+EXITED_FILE = "metrics-exited.json"
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    # A file may be folded away between listing the directory and reading it
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _sum(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            total = histograms.setdefault(key, [0] * len(values))
+            histograms[key] = [a + b for a, b in zip(total, values)]
+    return counters, histograms
+
+
+def _fold_exited(directory):
+    """
+    Add the files of processes that exited to EXITED_FILE and delete them,
+    so their counters still count without files piling up.
+    """
+    exited = [
+        path
+        for path in directory.glob("metrics-*-*.json")
+        if not _is_running(int(path.name.split("-")[1]))
+    ]
+    if not exited:
+        return
+
+    snapshots = map(_read, [directory / EXITED_FILE] + exited)
+    counters, histograms = _sum(snapshot for snapshot in snapshots if snapshot)
+    _write(
+        directory / EXITED_FILE,
+        {
+            "counters": [
+                [name, dict(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            "histograms": [
+                [name, dict(labels), values]
+                for (name, labels), values in histograms.items()
+            ],
+        },
+    )
+    for path in exited:
+        path.unlink(missing_ok=True)
+
+
+def collect():
+    """
+    Metrics of every process writing to METRICS_DIR summed up, or of this
+    process without one. Files of workers that exited are folded into one,
+    since their counters still count, until METRICS_DIR is emptied on deploy.
+    """
+    if not settings.METRICS_DIR:
+        return _sum([registry.snapshot()])
+
+    flush(force=True)
+    directory = Path(settings.METRICS_DIR)
+    with open(directory / "metrics.lock", "w") as lock:
+        # Readers never see a folded file counted twice, nor fold it twice
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _fold_exited(directory)
+        snapshots = map(_read, directory.glob("metrics-*.json"))
+        return _sum(snapshot for snapshot in snapshots if snapshot)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(labels, **extra):
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def render():
+    """
+    All the metrics in the Prometheus text exposition format.
+    """
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            # Every observation was counted in all the buckets it fits in
+            for bound, count in zip(DURATION_BUCKETS, values):
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {count}")
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {values[-1]}')
+            lines.append(f"{name}_sum{_labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
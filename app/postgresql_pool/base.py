@@ -0,0 +1,113 @@
+import os
+import threading
+import psycopg2
+import psycopg2.extras
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def is_alive(connection):
+    """
+    Whether a pooled connection still answers, it may have been dropped by a
+    restart of the server or an idle timeout while in the pool.
+    """
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        # Leave no transaction open, outside autocommit SELECT starts one
+        connection.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend borrowing its connections from an in-process pool.
+
+    Closing a connection at the end of a request hands it back to the pool of
+    the worker process instead of tearing it down, so threaded and async
+    workers keep POOL_SIZE connections open and reuse them.
+
+    Every thread using the database holds a connection until its request
+    ends, including the threads of run_concurrently. When all POOL_SIZE are
+    borrowed, a thread waits up to POOL_TIMEOUT seconds for one to be handed
+    back, then fails with an OperationalError. POOL_SIZE should cover the
+    threads of a worker that query at once: its thread count, times the
+    concurrent queries of an async view if it serves them.
+
+    With CONN_HEALTH_CHECKS, a borrowed connection is pinged first, and
+    discarded for another one if it does not answer.
+    """
+
+    def get_pool(self, conn_params):
+        """
+        Pool of the process for this alias, and a semaphore counting the
+        connections left to borrow.
+        """
+        # Pools are never shared with a forked process
+        key = (os.getpid(), self.alias)
+        with _pools_lock:
+            if key not in _pools:
+                pool_size = self.settings_dict["POOL_SIZE"]
+                # psycopg2 only keeps minconn idle connections around, and
+                # raises PoolError instead of waiting when all are borrowed
+                _pools[key] = (
+                    pool.ThreadedConnectionPool(pool_size, pool_size, **conn_params),
+                    threading.BoundedSemaphore(pool_size),
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        connection_pool, available = self.get_pool(conn_params)
+        timeout = self.settings_dict.get("POOL_TIMEOUT", 30)
+        if not available.acquire(timeout=timeout):
+            raise OperationalError(
+                f"No connection of the pool of {self.alias} was handed back "
+                f"within {timeout} seconds, POOL_SIZE may be too small"
+            )
+        health_checks = self.settings_dict["CONN_HEALTH_CHECKS"]
+        try:
+            # Every idle connection may be dead, the last try opens a new one
+            for _ in range(self.settings_dict["POOL_SIZE"] + 1):
+                connection = connection_pool.getconn()
+                if is_alive(connection) if health_checks else not connection.closed:
+                    break
+                connection_pool.putconn(connection, close=True)
+            else:
+                raise OperationalError(
+                    f"No connection of the pool of {self.alias} answered"
+                )
+        except Exception:
+            available.release()
+            raise
+
+        # Same setup as a new connection of the postgresql backend
+        options = self.settings_dict["OPTIONS"]
+        self.isolation_level = IsolationLevel(
+            options.get("isolation_level", IsolationLevel.READ_COMMITTED)
+        )
+        if "isolation_level" in options:
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection_pool, available = self.get_pool(self.get_connection_params())
+        try:
+            with self.wrap_database_errors:
+                # The pool rolls back any transaction left open
+                connection_pool.putconn(self.connection, close=self.connection.closed)
+        finally:
+            available.release()
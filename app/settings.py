@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "middlewares.metrics.MetricsMiddleware",
+    "middlewares.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,20 +60,18 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "middlewares.exception_logging.ExceptionLoggingMiddleware",
+    "middlewares.query_inspection.QueryInspectionMiddleware",
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
-        "api.auth.BearerTokenAuthentication",
+        "api.auth.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-        "app.throttling.IPRateThrottle",
+        "app.throttling.CombinedRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "10000/hour",
@@ -114,9 +114,86 @@ DATABASES = {
         "PASSWORD": os.environ.get("DB_PASSWORD"),
         "HOST": os.environ.get("DB_HOST"),
         "PORT": os.environ.get("DB_PORT"),
+        # Seconds a connection is reused across requests, 0 closes it after each one
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "true") == "true",
     }
 }
 
+# Threaded and async workers can borrow connections from an in-process pool
+# instead, connections are then handed back to the pool after every request.
+# DB_POOL_SIZE should be at least the number of threads of a worker querying at
+# once, async views running their queries concurrently count one per query.
+# Past it, requests wait up to DB_POOL_TIMEOUT seconds for a connection.
+if os.environ.get("DB_POOL_SIZE"):
+    DATABASES["default"].update(
+        {
+            "ENGINE": "app.postgresql_pool",
+            "CONN_MAX_AGE": 0,
+            "POOL_SIZE": int(os.environ.get("DB_POOL_SIZE")),
+            "POOL_TIMEOUT": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        }
+    )
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cache alias holding the throttle counters, it must be shared by every worker
+THROTTLE_CACHE = os.environ.get("THROTTLE_CACHE", "default")
+
+# Seconds a computed analytics response stays cached, writes invalidate it earlier
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get("ANALYTICS_CACHE_TIMEOUT", 60 * 60 * 24))
+
+# Seconds an authenticated token is trusted from the cache before it is checked again
+TOKEN_CACHE_TIMEOUT = int(os.environ.get("TOKEN_CACHE_TIMEOUT", 60))
+
+# Seconds shared caches such as a CDN may serve the public endpoints without asking
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get("PUBLIC_CACHE_MAX_AGE", 60))
+
+# Seconds a process serves public data from memory before checking the shared cache
+PUBLIC_DATA_LOCAL_TIMEOUT = int(os.environ.get("PUBLIC_DATA_LOCAL_TIMEOUT", 5))
+
+# Share of requests whose queries and timings are measured and logged
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get("INSTRUMENTATION_SAMPLE_RATE", 0.05))
+
+# Queries a request may run before its measurement is logged as a warning
+INSTRUMENTATION_QUERY_BUDGET = int(os.environ.get("INSTRUMENTATION_QUERY_BUDGET", 20))
+
+# Log the queries of every request to find N+1 and slow queries, for development
+# and staging only, see manage.py query_report
+QUERY_INSPECTION = os.environ.get("QUERY_INSPECTION") == "true"
+QUERY_INSPECTION_LOG = os.environ.get(
+    "QUERY_INSPECTION_LOG", BASE_DIR / "query_inspection.jsonl"
+)
+
+# Times a query shape may run in one request before it is reported as repeated
+QUERY_INSPECTION_REPEATS = int(os.environ.get("QUERY_INSPECTION_REPEATS", 3))
+
+# Milliseconds above which a query is reported as slow
+QUERY_INSPECTION_SLOW_MS = float(os.environ.get("QUERY_INSPECTION_SLOW_MS", 100))
+
+# Directory shared by the workers where each writes its metrics, so the metrics
+# endpoint of any of them reports all; without one a worker reports its own.
+# Workers of one host only, files of exited ones are folded into one by pid
+METRICS_DIR = os.environ.get("METRICS_DIR")
+
+# Seconds between two writes of the metrics of a worker to METRICS_DIR
+METRICS_FLUSH_INTERVAL = int(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -1,4 +1,8 @@
-from rest_framework.throttling import SimpleRateThrottle
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+from . import metrics
 
 
 class IPRateThrottle(SimpleRateThrottle):
@@ -6,3 +10,64 @@ class IPRateThrottle(SimpleRateThrottle):
 
     def get_cache_key(self, request, view):
         return self.get_ident(request)
+
+
+class CombinedRateThrottle(BaseThrottle):
+    """
+    Applies the ip rate and either the user or the anon rate to every request.
+
+    Each scope is a fixed window counter instead of a history of timestamps,
+    created with cache.add and counted with cache.incr on the THROTTLE_CACHE,
+    which should be shared by every worker. Both are atomic on Redis, so
+    concurrent requests cannot exceed a rate. Rejected requests count too.
+    """
+
+    cache_format = "throttle:{scope}:{ident}:{window}"
+    timer = SimpleRateThrottle.timer
+    parse_rate = SimpleRateThrottle.parse_rate
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE]
+        self.wait_time = None
+
+    def get_scopes(self, request):
+        ident = self.get_ident(request)
+        if request.user and request.user.is_authenticated:
+            return [("ip", ident), ("user", request.user.pk)]
+        return [("ip", ident), ("anon", ident)]
+
+    def increment(self, key, duration):
+        """
+        Count a request in the window of a key, starting it if needed.
+        """
+        created = self.cache.add(key, 0, timeout=duration)
+        metrics.inc(
+            "cache_requests_total",
+            cache="throttle",
+            result="miss" if created else "hit",
+        )
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # The window expired between add and incr
+            self.cache.add(key, 1, timeout=duration)
+            return 1
+
+    def allow_request(self, request, view):
+        now = self.timer()
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+
+        for scope, ident in self.get_scopes(request):
+            num_requests, duration = self.parse_rate(rates.get(scope))
+            if num_requests is None:
+                continue
+            window = int(now // duration)
+            key = self.cache_format.format(scope=scope, ident=ident, window=window)
+            if self.increment(key, duration) > num_requests:
+                metrics.inc("throttle_rejections_total", scope=scope)
+                self.wait_time = (window + 1) * duration - now
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_time
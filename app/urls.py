@@ -1,5 +1,11 @@
 from django.contrib import admin
 from django.urls import path
+from api.async_views import (
+    AsyncEffortCompletionView,
+    AsyncHabitPerformanceView,
+    AsyncRecentCompletionsView,
+    AsyncYearlyHabitPerformanceView,
+)
 from api.views import (
     HabitListCreateView,
     HabitRetrieveUpdateDestroyView,
@@ -9,14 +15,19 @@ from api.views import (
     EffortListCreateView,
     EffortRetrieveUpdateDestroyView,
     EffortListByWeekView,
+    EffortBulkUpsertView,
     LogoutView,
     EffortCompletionView,
     HabitPerformanceView,
     YearlyHabitPerformanceView,
     RecentCompletionsView,
+    HabitStreaksView,
+    RollingCompletionsView,
     SiteConfigView,
+    DashboardView,
     UserUpdateView,
     UserListView,
+    MetricsView,
     TicketListCreateView,
     TicketRetrieveUpdateDestroyView,
     AnnouncementListCreateView,
@@ -26,12 +37,18 @@ from api.views import (
     FeatureListCreateView,
     FeatureRetrieveUpdateDestroyView,
     PublicFeatureListView,
+    ActiveAnnouncementListView,
 )
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/features/", PublicFeatureListView.as_view()),
     path("api/site-config/", SiteConfigView.as_view()),
+    path(
+        "api/announcements/active/",
+        ActiveAnnouncementListView.as_view(),
+        name="active-announcements",
+    ),
     path("api/auth/register/", RegisterView.as_view(), name="register"),
     path("api/auth/login/", LoginView.as_view(), name="login"),
     path("api/auth/user/", CurrentUserView.as_view(), name="current-user"),
@@ -43,6 +60,7 @@ urlpatterns = [
         name="habit-detail",
     ),
     path("api/efforts/", EffortListCreateView.as_view(), name="effort-list-create"),
+    path("api/efforts/bulk/", EffortBulkUpsertView.as_view(), name="effort-bulk"),
     path(
         "api/efforts/<int:pk>/",
         EffortRetrieveUpdateDestroyView.as_view(),
@@ -67,10 +85,42 @@ urlpatterns = [
         YearlyHabitPerformanceView.as_view(),
         name="yearly-habit-performance",
     ),
+    path(
+        "api/completion/rolling/<int:year>/",
+        RollingCompletionsView.as_view(),
+        name="rolling-completions",
+    ),
+    path(
+        "api/performance/streaks/",
+        HabitStreaksView.as_view(),
+        name="habit-streaks",
+    ),
+    path(
+        "api/async/completion/<int:week>/",
+        AsyncEffortCompletionView.as_view(),
+        name="async-completion",
+    ),
+    path(
+        "api/async/completion/<int:week>/recent",
+        AsyncRecentCompletionsView.as_view(),
+        name="async-recent-completions",
+    ),
+    path(
+        "api/async/performance/<int:habit_id>/",
+        AsyncHabitPerformanceView.as_view(),
+        name="async-performance",
+    ),
+    path(
+        "api/async/performance/global/",
+        AsyncYearlyHabitPerformanceView.as_view(),
+        name="async-yearly-habit-performance",
+    ),
+    path("api/dashboard/<int:week>/", DashboardView.as_view(), name="dashboard"),
     path("api/user/profile/", UserUpdateView.as_view(), name="user-update"),
     path("api/tickets/", UserTicketListView.as_view(), name="user-ticket-list"),
     path("api/tickets/create/", TicketCreateView.as_view(), name="ticket-create"),
     path("api/backoffice/users/", UserListView.as_view(), name="backoffice-user-list"),
+    path("api/backoffice/metrics/", MetricsView.as_view(), name="backoffice-metrics"),
     path(
         "api/backoffice/tickets/",
         TicketListCreateView.as_view(),
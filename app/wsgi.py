@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Imported once the apps are loaded
+from api.services import warm_public_data  # noqa: E402
+
+warm_public_data()
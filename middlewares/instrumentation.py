@@ -0,0 +1,93 @@
+import contextlib
+import json
+import logging
+import random
+import time
+from django.conf import settings
+from django.db import connections
+
+
+class Measurement(object):
+    """
+    Queries and timings of a request, in milliseconds. Also the execute
+    wrapper counting the queries.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += (time.perf_counter() - start) * 1000
+
+
+class InstrumentationMiddleware(object):
+    """
+    Measure a sample of the requests: their query count and SQL time, the time
+    spent rendering the response and in the view. The measurement is sent as
+    a Server-Timing header and logged as a JSON line, as a warning when the
+    request ran more queries than the budget. Requests out of the sample are
+    not wrapped at all.
+
+    Only the queries run in the request thread are counted, not those of async
+    views running in worker threads.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        request.measurement = measurement = Measurement()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(measurement))
+            response = self.get_response(request)
+        total = (time.perf_counter() - measurement.start) * 1000
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={measurement.db:.1f};desc="{measurement.queries} queries"',
+                f"view;dur={total - measurement.render:.1f}",
+                f"render;dur={measurement.render:.1f}",
+                f"total;dur={total:.1f}",
+            ]
+        )
+        line = json.dumps(
+            {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "queries": measurement.queries,
+                "db_ms": round(measurement.db, 1),
+                "view_ms": round(total - measurement.render, 1),
+                "render_ms": round(measurement.render, 1),
+                "total_ms": round(total, 1),
+            }
+        )
+        if measurement.queries > settings.INSTRUMENTATION_QUERY_BUDGET:
+            logging.warning(f"Query budget exceeded: {line}")
+        else:
+            logging.info(line)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered, serializing their data, after the view
+        measurement = getattr(request, "measurement", None)
+        if measurement is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                measurement.render = (time.perf_counter() - start) * 1000
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,49 @@
+import contextlib
+import time
+from django.db import connections
+from app import metrics
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(object):
+    """
+    Count every request, its latency and its queries by URL name in the
+    metrics registry. Paths matching no route share one name, so that
+    scanners cannot create series without bound.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        counter = QueryCounter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        url_name = (match.url_name or match.route) if match else "unmatched"
+        metrics.observe(
+            "http_request_duration_seconds",
+            time.perf_counter() - start,
+            url_name=url_name,
+        )
+        metrics.inc(
+            "http_requests_total",
+            url_name=url_name,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.inc("db_queries_total", counter.count, url_name=url_name)
+        metrics.flush()
+        return response
@@ -0,0 +1,90 @@
+import collections
+import contextlib
+import json
+import re
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+_IN_LIST = re.compile(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    Shape of a query: literals and placeholders become ? and IN lists of any
+    length are the same.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryLog(object):
+    """
+    Execute wrapper keeping the shape and duration of every query.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.queries.append((normalize_sql(sql), duration))
+
+    def report(self, request, response):
+        shapes = collections.Counter(sql for sql, _ in self.queries)
+        match = request.resolver_match
+        return {
+            "url_name": (match.url_name or match.route) if match else None,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": len(self.queries),
+            "db_ms": round(sum(duration for _, duration in self.queries), 2),
+            "repeated": [
+                {"sql": sql, "count": count}
+                for sql, count in shapes.most_common()
+                if count >= settings.QUERY_INSPECTION_REPEATS
+            ],
+            "slow": [
+                {"sql": sql, "ms": round(duration, 2)}
+                for sql, duration in self.queries
+                if duration >= settings.QUERY_INSPECTION_SLOW_MS
+            ],
+        }
+
+
+class QueryInspectionMiddleware(object):
+    """
+    Development and staging aid, off unless QUERY_INSPECTION is set. Appends
+    a JSON line per request to QUERY_INSPECTION_LOG with its query count and
+    SQL time, the query shapes repeated within the request, a sign of N+1
+    queries, and the slow queries. manage.py query_report sums them up by
+    URL name.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+
+        if request.resolver_match is not None:
+            with open(settings.QUERY_INSPECTION_LOG, "a") as file:
+                file.write(json.dumps(log.report(request, response)) + "\n")
+        return response